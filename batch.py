@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from file_catalog import FileCatalog
+
+
+def process_wafer(location, asic_list, sfc, output_path, catalog, plots, parser_options=None,
+                  plot_options=None, render_workers=1, stats=False, store=None, reuse_store=False):
+    '''
+    Parses and plots one wafer. Module level so it can run in a worker process.
+
+    Parameters
+    ----------
+    location : Path
+        Input Directory
+    asic_list : List
+        List of ASIC from configuration file
+    sfc : String
+        SFC of Wafer
+    output_path : Path
+        Directory to store HeatMap output
+    catalog : FileCatalog
+        Catalog holding the files of this SFC
+    plots : List
+        'Tx' and/or 'Rx'
+    parser_options : Dictionary
+        Additional keyword arguments for parse_data.Parser
+    plot_options : Dictionary
+        Additional keyword arguments for plot_wafers Plotters
+    render_workers : Integer
+        Number of processes used to render the plots of this wafer
+    stats : Boolean
+        Also write summary statistics CSV files next to the HeatMaps (see wafer_stats)
+    store : WaferStore
+        Parsed results are exported to store
+    reuse_store : Boolean
+        Load results exported to store earlier instead of parsing XML files again
+
+    Returns
+    -------
+    sfc : String
+
+    '''
+    import instrument
+    import parse_data
+
+    if reuse_store and store is not None and store.has(sfc):
+        print(f'Loading {sfc} from {store.location}')
+        with instrument.span('store_load', {'sfc': sfc}):
+            df_amb, df_hot, df_rx = store.load(sfc)
+    else:
+        df_amb, df_hot, df_rx = parse_data.Parser(
+            location, asic_list, sfc, catalog=catalog, **(parser_options or {})).process_data()
+        if store is not None:
+            with instrument.span('store_save', {'sfc': sfc}):
+                store.save(sfc, df_amb, df_hot, df_rx)
+    render_wafer(sfc, df_amb, df_hot, df_rx, asic_list, output_path, plots, plot_options,
+                 render_workers, stats)
+    return sfc
+
+
+def render_wafer(sfc, df_amb, df_hot, df_rx, asic_list, output_path, plots, plot_options=None,
+                 render_workers=1, stats=False):
+    '''
+    Plots (and optionally writes statistics of) one parsed wafer.
+
+    Parameters
+    ----------
+    df_amb, df_hot, df_rx : Dictionary of {Test:WaferData}
+        Parser.process_data results
+    (other parameters as process_wafer)
+
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+
+    import instrument
+    import plot_wafers
+
+    jobs = []
+    if 'Tx' in plots:
+        jobs.append(plot_wafers.RenderJob(sfc, 'Tx', df_amb, df_hot, asic_list,
+                                          output_path, plot_options))
+    if 'Rx' in plots:
+        jobs.append(plot_wafers.RenderJob(sfc, 'Rx', None, df_rx, asic_list,
+                                          output_path, plot_options))
+    with instrument.span('render', {'sfc': sfc}, figures=len(jobs)):
+        plot_wafers.render_jobs(jobs, render_workers)
+
+    if stats:
+        import wafer_stats
+        for job in jobs:
+            baseline = list(job.baseline.values())[-1] if job.baseline else None
+            elevated = list(job.elevated.values())[-1]
+            with instrument.span('stats', {'sfc': sfc}, asics=len(elevated)):
+                wafer_stats.WaferStats.from_results(
+                    sfc, baseline, elevated,
+                    limits=plot_wafers.channel_limits(job.channel)).save(output_path)
+
+
+class BatchRunner():
+    '''
+    Creates HeatMaps for many wafers from a single catalog scan.
+    Wafers are parsed and plotted concurrently in a process pool, one output per wafer and plot.
+    '''
+
+    def __init__(self, location, asic_list, output_path, workers=1, plots=('Tx', 'Rx'), catalog=None,
+                 parser_options=None, plot_options=None, render_workers=1, stats=False, store=None,
+                 reuse_store=False):
+        self.location = location
+        self.asic_list = asic_list
+        self.output_path = output_path
+        self.workers = workers
+        self.plots = list(plots)
+        # Additional keyword arguments for parse_data.Parser (i.e. caches)
+        self.parser_options = parser_options
+        # Additional keyword arguments for plot_wafers Plotters (i.e. raster)
+        self.plot_options = plot_options
+        # Processes used to render the plots of each wafer
+        self.render_workers = render_workers
+        # Write summary statistics next to each HeatMap
+        self.stats = stats
+        # wafer_store.WaferStore parsed results are exported to (and reused from)
+        self.store = store
+        self.reuse_store = reuse_store
+        # FileCatalog or file_index.FileIndex (scanned once when not given)
+        self.catalog = catalog if catalog is not None else FileCatalog(location)
+
+    def select_sfcs(self, sfcs=None, since=None):
+        '''
+        Returns list of SFCs to process.
+
+        Parameters
+        ----------
+        sfcs : List of Strings
+            SFCs requested. None for all SFCs in catalog.
+        since : datetime
+            Only SFCs with a test file timestamp on or after since.
+
+        '''
+        found = self.catalog.sfcs(since=since)
+        if sfcs is None:
+            return found
+
+        selected = []
+        for sfc in [x.strip().upper() for x in sfcs]:
+            if sfc in found:
+                selected.append(sfc)
+            else:
+                print(f'No SFC matching {sfc}')
+        return selected
+
+    def run(self, sfcs=None, since=None):
+        '''
+        Parses and plots each selected wafer.
+
+        Returns
+        -------
+        status : Dictionary of {SFC:String}
+            'OK' or error message for each wafer.
+
+        '''
+        sfcs = self.select_sfcs(sfcs, since)
+        print(f'Processing {len(sfcs)} wafers.')
+
+        # Workers only receive the catalog entries of their own wafer
+        jobs = [(self.location, self.asic_list, sfc, self.output_path,
+                 FileCatalog(self.location, self.catalog.entries(
+                     sfc, include_aborted=True)),
+                 self.plots, self.parser_options, self.plot_options, self.render_workers,
+                 self.stats, self.store, self.reuse_store)
+                for sfc in sfcs]
+
+        status = {}
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = {sfc: pool.submit(process_wafer, *job)
+                           for sfc, job in zip(sfcs, jobs)}
+                for sfc, future in futures.items():
+                    status[sfc] = self.result(future.result)
+        else:
+            for sfc, job in zip(sfcs, jobs):
+                status[sfc] = self.result(lambda: process_wafer(*job))
+
+        failed = [k for k, v in status.items() if v != 'OK']
+        print(f'{len(status) - len(failed)}/{len(status)} wafers completed.')
+        for sfc in failed:
+            print(f'{sfc}: {status[sfc]}')
+        return status
+
+    def result(self, func):
+        # Parser exits when a wafer's dataset is incomplete, which should not stop the batch
+        try:
+            func()
+        except SystemExit:
+            return 'Incomplete dataset'
+        except Exception as e:
+            return f'{type(e).__name__}: {e}'
+        return 'OK'
+
+
+if __name__ == '__main__':
+    pass
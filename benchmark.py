@@ -0,0 +1,140 @@
+'''
+Benchmark of catalog scan, sort, parse, stats and render on synthetic data at several scales.
+
+Example:
+    python benchmark.py --scales 1x10 4x77 --workers 1 4 --profile bench.jsonl
+
+Each scale is WAFERSxASICS. Data is generated once per scale (in --work, reused between runs
+with the same settings) and each phase is timed with instrument spans, so results can be
+compared between versions of parse_data and plot_wafers.
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import instrument
+from synthetic_data import DEFAULT_ASIC_LIST, SyntheticData
+
+
+def parse_scale(text):
+    wafers, asics = (int(x) for x in text.lower().split('x'))
+    if wafers < 1 or not 1 <= asics <= len(DEFAULT_ASIC_LIST):
+        raise argparse.ArgumentTypeError(f'scale must be WAFERSxASICS with 1 to '
+                                         f'{len(DEFAULT_ASIC_LIST)} ASICs, got {text}')
+    return wafers, asics
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark parsing and plotting on synthetic data.')
+    parser.add_argument('--scales', nargs='+', type=parse_scale, default=[(1, 10), (2, 77)],
+                        metavar='WAFERSxASICS', help='Data sizes (default: 1x10 2x77)')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1],
+                        help='Parser worker counts to compare (default: 1)')
+    parser.add_argument('--retest', type=float, default=0.2,
+                        help='Probability of a retest file per test (default: %(default)s)')
+    parser.add_argument('--aborted', type=float, default=0.1,
+                        help='Probability of an ABORTED file per test (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=2,
+                        help='Folder levels above the files (default: %(default)s)')
+    parser.add_argument('--render', choices=['raster', 'grid', 'none'], default='raster',
+                        help='Renderer to time on the first wafer (default: %(default)s)')
+    parser.add_argument('--work', metavar='DIR',
+                        help='Directory for generated data and plots (default: temporary, removed after)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Also append span records to FILE (JSON lines)')
+    return parser.parse_args(argv)
+
+
+def run_scale(location, output_path, wafers, asics, workers, args):
+    '''
+    Generates (if needed) and benchmarks one scale. Spans are labelled with the scale and workers.
+    '''
+    import matplotlib
+    matplotlib.use('Agg')
+
+    import parse_data
+    import plot_wafers
+    import wafer_stats
+    from file_catalog import FileCatalog
+
+    scale = f'{wafers}x{asics}'
+    data = SyntheticData(location, wafers, DEFAULT_ASIC_LIST[:asics], args.retest, args.aborted,
+                         args.depth)
+    if not os.path.exists(os.path.join(location, 'configuration_synthetic.json')):
+        with instrument.span('generate', {'scale': scale}, wafers=wafers, asics=wafers * asics):
+            data.generate()
+        data.write_config()
+    labels = {'scale': scale, 'workers': workers}
+
+    with instrument.span('bench_scan', labels) as s:
+        catalog = FileCatalog(location)
+        s.add(files=sum(len(catalog.entries(x, include_aborted=True)) for x in catalog.sfcs()))
+
+    parsed = []
+    for sfc in catalog.sfcs():
+        parser = parse_data.Parser(location, data.asic_list, sfc, workers=workers, catalog=catalog,
+                                   layout=data.layout)
+        files = parser.collect_files(location, sfc)
+        with instrument.span('bench_sort', labels, files=len(files)):
+            parser.sort_files(files)
+        with instrument.span('bench_parse', labels, asics=asics):
+            parsed.append((sfc, parser.process_data()))
+
+    with instrument.span('bench_stats', labels, asics=wafers * asics):
+        for sfc, (df_amb, df_hot, df_rx) in parsed:
+            tx = wafer_stats.WaferStats.from_results(
+                sfc, list(df_amb.values())[-1], list(df_hot.values())[-1],
+                limits=plot_wafers.channel_limits('Tx'))
+            tx.summary()
+            tx.profiles()
+
+    if args.render != 'none':
+        sfc, (df_amb, df_hot, df_rx) = parsed[0]
+        with instrument.span('bench_render', dict(labels, renderer=args.render), asics=asics):
+            plot_wafers.Plotter_Tx(df_amb, df_hot, output_path, data.asic_list, sfc,
+                                   raster=args.render == 'raster', layout=data.layout).plot_wafers()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    work = os.path.abspath(args.work) if args.work else tempfile.mkdtemp(prefix='heatmap_bench_')
+    recorder = instrument.start(args.profile)
+    try:
+        for wafers, asics in args.scales:
+            # Data of a scale is reused by later runs with the same settings
+            location = os.path.join(work, f'data_{wafers}x{asics}_r{args.retest}_a{args.aborted}'
+                                          f'_d{args.depth}')
+            output_path = os.path.join(work, 'plots')
+            os.makedirs(output_path, exist_ok=True)
+            for workers in args.workers:
+                run_scale(location, output_path, wafers, asics, workers, args)
+    finally:
+        instrument.stop()
+        if not args.work:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print_results(recorder)
+    return 0
+
+
+def print_results(recorder):
+    '''
+    Prints one line per benchmark span (scale, workers, phase, wall and CPU seconds, process peak
+    memory and its increase during the phase).
+    '''
+    print(f'{"Scale":>8}  {"Workers":>7}  {"Phase":<8}  {"Wall s":>9}  {"CPU s":>9}  '
+          f'{"Proc Peak MiB":>13}  {"Peak +MiB":>9}')
+    for record in recorder.read():
+        if not record['name'].startswith('bench_') or record.get('pid') != os.getpid():
+            continue
+        peak, growth = ('' if record.get(x) is None else f'{record[x]:.1f}'
+                        for x in ('peak_rss_mb', 'rss_growth_mb'))
+        print(f'{record["scale"]:>8}  {record["workers"]:>7}  {record["name"][6:]:<8}  '
+              f'{record["wall_s"]:>9.3f}  {record["cpu_s"]:>9.3f}  {peak:>13}  {growth:>9}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
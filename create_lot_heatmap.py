@@ -0,0 +1,158 @@
+'''
+Command line entry point for lot level HeatMaps (per element Mean, Std and Fail Rate of
+normalized element values across wafers).
+
+Example:
+    python create_lot_heatmap.py LOT1 R0EQLE R0ABCD --output C:/PATH/TO/OUTPUT
+
+The aggregate of each channel is stored as "{Lot} - {Channel} Lot.npz" in --store. Running again
+with more SFCs only parses the new wafers and updates the stored aggregate.
+
+Only one wafer is held in memory at a time. With --export DIR --reuse-export, wafers exported
+earlier are read from memory-mapped float32 files instead of being parsed again, so lots larger
+than memory can be rebuilt (i.e. with different limits) without touching the XML files.
+'''
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from create_wafer_heatmap import load_config
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Create lot level HeatMaps from the wafers of one or more SFCs.')
+    parser.add_argument('lot', help='Name of lot (used for aggregate and output file names)')
+    parser.add_argument('sfc', nargs='*',
+                        help='SFC(s) of wafers to add. Omit with --since to add all SFCs tested since a date.')
+    parser.add_argument('-c', '--config', default='configuration_app.json',
+                        help='JSON configuration file (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='.',
+                        help='Directory to store HeatMap output (default: current directory)')
+    parser.add_argument('--store', metavar='DIR',
+                        help='Directory of stored lot aggregates (default: output directory)')
+    parser.add_argument('-p', '--plots', choices=['tx', 'rx', 'both'], default='both',
+                        help='Channels to aggregate (default: %(default)s)')
+    parser.add_argument('-s', '--since', type=lambda x: datetime.strptime(x, '%Y-%m-%d'),
+                        help='Only SFCs tested on or after date (YYYY-MM-DD)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of processes used for parsing each wafer (default: %(default)s)')
+    parser.add_argument('--raster', action='store_true',
+                        help='Use fast single image renderer instead of seaborn subplots')
+    parser.add_argument('--dtype', choices=['float64', 'float32'], default='float32',
+                        help='Type of parsed element values (default: %(default)s)')
+    parser.add_argument('--export', metavar='DIR',
+                        help='Export parsed results of each wafer to DIR (--dtype .npy + JSON metadata)')
+    parser.add_argument('--reuse-export', action='store_true',
+                        help='Load wafers already exported to --export DIR (memory-mapped) instead of '
+                             'parsing them again')
+    parser.add_argument('--index', metavar='DB',
+                        help='Use persistent SQLite file index instead of scanning input directory')
+    args = parser.parse_args(argv)
+
+    if not args.sfc and args.since is None:
+        parser.error('provide at least one SFC or --since')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.reuse_export and not args.export:
+        parser.error('--reuse-export requires --export DIR')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    location, asic_list, layout = load_config(args.config)
+    if location is None:
+        return 1
+
+    output_path = os.path.abspath(args.output)
+    store_path = os.path.abspath(args.store or args.output)
+    for path in {output_path, store_path}:
+        if not os.path.isdir(path):
+            print(f'Directory "{path}" does not exist.')
+            return 1
+
+    if args.index:
+        from file_index import FileIndex
+        catalog = FileIndex(location, args.index)
+    else:
+        from file_catalog import FileCatalog
+        catalog = FileCatalog(location)
+
+    from batch import BatchRunner
+    store = None
+    if args.export:
+        from wafer_store import WaferStore
+        store = WaferStore(args.export, args.dtype)
+
+    requested = [x.strip().upper() for x in args.sfc]
+    sfcs = []
+    if args.reuse_export:
+        # Exported wafers do not need their XML files
+        sfcs = [x for x in requested if store.has(x)]
+    missing = [x for x in requested if x not in sfcs]
+    if missing or (not requested and args.since is not None):
+        sfcs += [x for x in BatchRunner(location, asic_list, output_path, catalog=catalog).select_sfcs(
+            missing or None, args.since) if x not in sfcs]
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import parse_data
+    from lot_aggregate import LotAggregate
+
+    # Existing aggregates are continued, only wafers not yet added are parsed
+    channels = {'tx': ['Tx'], 'rx': ['Rx'], 'both': ['Tx', 'Rx']}[args.plots]
+    paths = {x: os.path.join(store_path, f'{args.lot} - {x} Lot.npz') for x in channels}
+    aggregates = {}
+    for channel, path in paths.items():
+        try:
+            aggregates[channel] = LotAggregate.load(path, layout) if os.path.exists(path) \
+                else LotAggregate(args.lot, channel, layout)
+        except ValueError as e:
+            print(e)
+            return 1
+
+    failed = []
+    for sfc in sfcs:
+        if all(sfc in x.sfcs for x in aggregates.values()):
+            print(f'{sfc} is already in lot {args.lot}.')
+            continue
+        if args.reuse_export and store.has(sfc):
+            print(f'Loading {sfc} from {store.location}')
+            df_amb, df_hot, df_rx = store.load(sfc)
+        else:
+            try:
+                df_amb, df_hot, df_rx = parse_data.Parser(
+                    location, asic_list, sfc, dtype=args.dtype, workers=args.workers,
+                    catalog=catalog, layout=layout).process_data()
+            except SystemExit:
+                # Parser exits when a wafer's dataset is incomplete, which should not stop the lot
+                failed.append(sfc)
+                continue
+            if store is not None:
+                store.save(sfc, df_amb, df_hot, df_rx)
+        results = {'Tx': {'Baseline': list(df_amb.values())[-1],
+                          'Elevated': list(df_hot.values())[-1]},
+                   'Rx': {'Elevated': list(df_rx.values())[-1]}}
+        for channel, aggregate in aggregates.items():
+            if aggregate.add(sfc, results[channel]):
+                # Saved after every wafer so an interrupted run keeps the wafers already added
+                aggregate.save(paths[channel])
+
+    for channel, aggregate in aggregates.items():
+        if len(aggregate.sfcs) < 1:
+            print(f'No wafers in {args.lot} {channel} lot.')
+            continue
+        print(f'{args.lot} {channel}: {len(aggregate.sfcs)} wafers.')
+        aggregate.plot(output_path, args.raster)
+
+    for sfc in failed:
+        print(f'{sfc}: Incomplete dataset')
+    print(f'Plots saved at {output_path}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
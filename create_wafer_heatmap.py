@@ -0,0 +1,193 @@
+'''
+Command line entry point for creating Wafer HeatMaps without a GUI.
+
+Example:
+    python create_wafer_heatmap.py R0EQLE --output C:/PATH/TO/OUTPUT --plots tx
+
+Heavy libraries (pandas, lxml, matplotlib, seaborn) are only imported once the
+configuration and SFC have been validated.
+'''
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Create Baseline vs Elevated Wafer HeatMaps for one or more SFCs.')
+    parser.add_argument('sfc', nargs='*',
+                        help='SFC(s) of wafers to plot. Omit with --since to plot all SFCs tested since a date.')
+    parser.add_argument('-c', '--config', default='configuration_app.json',
+                        help='JSON configuration file (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='.',
+                        help='Directory to store HeatMap output (default: current directory)')
+    parser.add_argument('-p', '--plots', choices=['tx', 'rx', 'both'], default='both',
+                        help='HeatMaps to create (default: %(default)s)')
+    parser.add_argument('-s', '--since', type=lambda x: datetime.strptime(x, '%Y-%m-%d'),
+                        help='Only SFCs tested on or after date (YYYY-MM-DD)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of processes used for parsing and plotting (default: %(default)s)')
+    parser.add_argument('--raster', action='store_true',
+                        help='Use fast single image renderer instead of seaborn subplots')
+    parser.add_argument('--delta', action='store_true',
+                        help='Add an Elevated / Baseline ratio panel to the Tx HeatMap')
+    parser.add_argument('--stats', action='store_true',
+                        help='Also write summary statistics (CSV) next to each HeatMap')
+    parser.add_argument('--dtype', choices=['float64', 'float32'], default='float64',
+                        help='Type of parsed element values, float32 halves memory (default: %(default)s)')
+    parser.add_argument('--export', metavar='DIR',
+                        help='Export parsed results of each wafer to DIR (float32 .npy + JSON metadata)')
+    parser.add_argument('--reuse-export', action='store_true',
+                        help='Load wafers already exported to --export DIR instead of parsing them again')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Append timing/memory records of each phase to FILE (JSON lines) '
+                             'and print a summary table')
+    parser.add_argument('--index', metavar='DB',
+                        help='Use persistent SQLite file index instead of scanning input directory')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and render each wafer as soon as all its test files '
+                             'have landed (all SFCs, or only the SFCs given). Uses the file index '
+                             '(--index DB, or the default database) to poll for new files')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='Seconds between checks for new files in --watch mode (default: %(default)s)')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='THREADS',
+                        help='Read files ahead in THREADS threads while parsing (for network shares, '
+                             'at most 64 MiB held in memory)')
+    parser.add_argument('--mirror-cache', metavar='DIR',
+                        help='Keep local copies of XML files in DIR')
+    parser.add_argument('--result-cache', metavar='DIR',
+                        help='Keep parsed results in DIR')
+    args = parser.parse_args(argv)
+
+    if not args.sfc and args.since is None and not args.watch:
+        parser.error('provide at least one SFC or --since')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.prefetch < 0:
+        parser.error('--prefetch must not be negative')
+    if args.reuse_export and not args.export:
+        parser.error('--reuse-export requires --export DIR')
+    return args
+
+
+def load_config(json_file):
+    '''
+    Reads Location, ASIC List and Wafer Layout from JSON Configuration File.
+
+    Returns
+    -------
+    location : Path
+        Input Directory, None if configuration is not valid.
+    asic_list : List
+    layout : WaferLayout
+
+    '''
+    json_file = os.path.abspath(json_file)
+    if not os.path.exists(json_file):
+        print(f'File "{json_file}" does not exist.')
+        return None, None, None
+
+    with open(json_file) as f:
+        js = json.load(f)
+
+    location = os.path.abspath(js["input_directory"])
+    if not os.path.isdir(location):
+        print(f'Input directory "{location}" does not exist.')
+        return None, None, None
+
+    # Wafer geometry is checked before any file is read
+    from wafer_layout import WaferLayout
+    try:
+        layout = WaferLayout.from_config(js)
+    except ValueError as e:
+        print(f'Configuration "{json_file}" is not valid: {e}')
+        return None, None, None
+    return location, js["asic_list"], layout
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    location, asic_list, layout = load_config(args.config)
+    if location is None:
+        return 1
+
+    output_path = os.path.abspath(args.output)
+    if not os.path.isdir(output_path):
+        print(f'Output directory "{output_path}" does not exist.')
+        return 1
+
+    # File catalog only needs the standard library
+    # Watch mode polls the persistent index (default database) instead of walking the share
+    if args.index or args.watch:
+        from file_index import FileIndex
+        catalog = FileIndex(location, args.index) if args.index else FileIndex(location)
+    else:
+        from file_catalog import FileCatalog
+        catalog = FileCatalog(location)
+
+    # NumPy is not imported until a wafer is parsed, so a run without matching SFCs fails fast
+    from batch import BatchRunner
+    plots = {'tx': ['Tx'], 'rx': ['Rx'], 'both': ['Tx', 'Rx']}[args.plots]
+    parser_options = {'layout': layout, 'prefetch': args.prefetch, 'dtype': args.dtype}
+    runner = BatchRunner(location, asic_list, output_path, workers=args.workers,
+                         plots=plots, catalog=catalog, parser_options=parser_options,
+                         plot_options={'raster': args.raster, 'layout': layout,
+                                       'delta': args.delta},
+                         stats=args.stats)
+
+    sfcs = [] if args.watch else runner.select_sfcs(args.sfc or None, args.since)
+    if len(sfcs) < 1 and not args.watch:
+        print('No SFC matching that value')
+        return 1
+
+    # Several wafers are processed in parallel, a single wafer parses its files
+    # and renders its plots in parallel
+    if len(sfcs) == 1 or args.watch:
+        parser_options['workers'] = args.workers
+        runner.render_workers = args.workers
+    if args.mirror_cache or args.result_cache:
+        import file_cache
+        if args.mirror_cache:
+            parser_options['mirror_cache'] = file_cache.MirrorCache(
+                args.mirror_cache)
+        if args.result_cache:
+            parser_options['result_cache'] = file_cache.ResultCache(
+                args.result_cache)
+
+    if args.export:
+        from wafer_store import WaferStore
+        runner.store = WaferStore(args.export)
+        runner.reuse_store = args.reuse_export
+
+    if args.profile:
+        import instrument
+        instrument.start(args.profile)
+
+    if args.watch:
+        from watch import WaferWatcher
+        # Wafers already complete are only rendered when asked for with --since
+        watcher = WaferWatcher(location, asic_list, output_path, catalog=catalog,
+                               sfcs=args.sfc or None, since=args.since,
+                               render_existing=args.since is not None, interval=args.interval,
+                               plots=plots, parser_options=parser_options,
+                               plot_options=runner.plot_options,
+                               render_workers=runner.render_workers, stats=args.stats,
+                               store=runner.store)
+        status = {sfc: 'OK' for sfc in watcher.run()}
+    else:
+        status = runner.run(sfcs)
+
+    if args.profile:
+        print(instrument.stop().summary())
+        print(f'Timing records appended to {os.path.abspath(args.profile)}')
+    if all(x == 'OK' for x in status.values()):
+        print(f'Plots saved at {output_path}')
+        return 0
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@ import json
 import os
 import parse_data
 import plot_wafers
+import wafer_layout
 from tkinter import filedialog
 from tkinter import *
 
@@ -25,14 +26,15 @@ if not os.path.exists(json_file):
 with open(json_file) as f:
     js = json.load(f)
 
-# Unpack Location and ASIC List from JSON
+# Unpack Location, ASIC List and Wafer Layout from JSON
 location = os.path.abspath(js["input_directory"])
 asic_list = js["asic_list"]
+layout = wafer_layout.WaferLayout.from_config(js)
 
 # Run Parser_Rx then Plotter_Rx
 df_amb, df_hot, df_rx = parse_data.Parser(
-    location, asic_list, sfc).process_data()
+    location, asic_list, sfc, layout=layout).process_data()
 plot_wafers.Plotter_Rx(df_rx, output_path,
-                       asic_list, sfc).plot_wafers()
+                       asic_list, sfc, layout=layout).plot_wafers()
 
 print(f'Plots saved at {output_path}')
@@ -0,0 +1,45 @@
+# Import Libraries, Input Directory, ASIC List
+import json
+import os
+from tkinter import *
+from tkinter import filedialog
+
+import batch
+import wafer_layout
+
+if __name__ == '__main__':
+    # Ask for directory to store HeatMap output
+    root = Tk()
+    root.withdraw()
+    output_path = filedialog.askdirectory(
+        title="Select Save Location", mustexist=True)
+
+    # Input SFCs (None for all SFCs found)
+    sfcs = ['R0EQLE']
+    # Only SFCs tested on or after this date (None for no limit)
+    # i.e. datetime.datetime(2022, 5, 1) after importing datetime
+    since = None
+    # Number of wafers processed at the same time
+    workers = os.cpu_count()
+
+    # Confirm Config file exists
+    json_file = os.path.abspath('configuration_app.json')
+    if not os.path.exists(json_file):
+        print(
+            f'File "{os.path.basename(json_file)}" does not exist in source directory.')
+
+    # Opens JSON Configuration File
+    with open(json_file) as f:
+        js = json.load(f)
+
+    # Unpack Location, ASIC List and Wafer Layout from JSON
+    location = os.path.abspath(js["input_directory"])
+    asic_list = js["asic_list"]
+    layout = wafer_layout.WaferLayout.from_config(js)
+
+    # Run Parser and Plotters for every wafer
+    batch.BatchRunner(location, asic_list, output_path, workers=workers,
+                      parser_options={'layout': layout},
+                      plot_options={'layout': layout}).run(sfcs, since)
+
+    print(f'Plots saved at {output_path}')
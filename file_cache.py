@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+class FileCache():
+    '''
+    Base class for persistent caches stored in a local folder.
+
+    An 'index.json' file records the file name, size and last use time of every entry.
+    Least recently used entries are evicted when the total size exceeds max_bytes.
+    Several processes can share a cache (i.e. wafers parsed in a process pool): save() merges
+    the index written by the others under a lock file before evicting.
+    '''
+
+    def __init__(self, location, max_bytes):
+        self.location = os.path.abspath(os.path.expanduser(location))
+        self.max_bytes = max_bytes
+        os.makedirs(self.location, exist_ok=True)
+        self.index_path = os.path.join(self.location, 'index.json')
+        self.lock_path = self.index_path + '.lock'
+        self.index = self.load_index()
+        # Keys dropped by this process, not taken back from the index of other processes
+        self.removed = set()
+
+    def load_index(self):
+        '''
+        Reads index file. Entries whose files no longer exist are dropped.
+        '''
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {k: v for k, v in index.items()
+                if os.path.exists(os.path.join(self.location, v['file']))}
+
+    def fingerprint(self, path, *extra):
+        '''
+        Returns cache key for a source file based on its path, size and modification time.
+
+        Parameters
+        ----------
+        path : Path
+            Source file
+        extra : Strings
+            Additional values that make up the key
+
+        '''
+        st = os.stat(path)
+        text = '|'.join([os.path.abspath(path), str(st.st_size),
+                         str(st.st_mtime_ns)] + [str(x) for x in extra])
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        '''
+        Returns path of cached file for key (or None) and marks it as used.
+        '''
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        entry['used'] = time.time()
+        return os.path.join(self.location, entry['file'])
+
+    def add(self, key, file_name):
+        '''
+        Records file_name (already written to the cache folder) under key.
+        '''
+        size = os.path.getsize(os.path.join(self.location, file_name))
+        self.index[key] = {'file': file_name, 'size': size, 'used': time.time()}
+
+    def total_bytes(self):
+        return sum(x['size'] for x in self.index.values())
+
+    def evict(self):
+        '''
+        Deletes least recently used entries until total size is within max_bytes.
+        '''
+        total = self.total_bytes()
+        for key, entry in sorted(self.index.items(), key=lambda x: x[1]['used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.location, entry['file']))
+            except FileNotFoundError:
+                pass
+            total -= entry['size']
+            del self.index[key]
+
+    def remove(self, key):
+        '''
+        Drops key from index (i.e. an unreadable entry).
+        '''
+        self.index.pop(key, None)
+        self.removed.add(key)
+
+    def merge_index(self):
+        '''
+        Adds entries saved by other processes to index (latest use time wins) and drops entries
+        whose files were deleted (i.e. evicted by another process).
+        '''
+        for key, entry in self.load_index().items():
+            if key in self.removed:
+                continue
+            if key not in self.index or self.index[key]['used'] < entry['used']:
+                self.index[key] = entry
+        self.index = {k: v for k, v in self.index.items()
+                      if os.path.exists(os.path.join(self.location, v['file']))}
+
+    def acquire_lock(self, timeout=60.0, stale=120.0):
+        '''
+        Creates lock file of index. A lock older than stale seconds is left from a process that
+        did not finish and is taken over; after timeout seconds the index is written regardless.
+        '''
+        start = time.time()
+        while True:
+            try:
+                os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) > stale:
+                        os.remove(self.lock_path)
+                        continue
+                except OSError:
+                    continue
+            if time.time() - start > timeout:
+                return False
+            time.sleep(0.05)
+
+    def save(self):
+        '''
+        Merges index of other processes, evicts entries over the size limit and writes index file.
+        '''
+        locked = self.acquire_lock()
+        try:
+            self.merge_index()
+            self.evict()
+            # Unique name, so processes never replace each other's partly written index
+            tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+        finally:
+            if locked:
+                os.remove(self.lock_path)
+
+
+class MirrorCache(FileCache):
+    '''
+    Persistent local mirror of Test Result files (XML) from a network share.
+
+    Files are keyed by source path, size and modification time, so repeat runs against an
+    unchanged share read local copies and changed files are copied again.
+    '''
+
+    def __init__(self, location='~/tmp_HotChuck_cache', max_bytes=2 * 1024**3):
+        super().__init__(location, max_bytes)
+
+    def get(self, path):
+        '''
+        Returns path of local copy of file, copying it into the cache if needed.
+
+        Parameters
+        ----------
+        path : Path
+            Source Test Result file (XML)
+
+        Returns
+        -------
+        local_path : Path
+
+        '''
+        key = self.fingerprint(path)
+        local_path = self.lookup(key)
+        if local_path is not None and not os.path.exists(local_path):
+            # Evicted by another process sharing the cache
+            self.remove(key)
+            local_path = None
+        if local_path is None:
+            file_name = key + '.xml'
+            local_path = os.path.join(self.location, file_name)
+            shutil.copyfile(path, local_path)
+            self.add(key, file_name)
+        return local_path
+
+    def get_bytes(self, path):
+        '''
+        Returns contents of file, from the local copy if cached. A file that is not cached is read
+        once from the source and the same bytes are written to the cache.
+        Safe to call from several threads (see file_reader.PrefetchReader).
+        '''
+        key = self.fingerprint(path)
+        local_path = self.lookup(key)
+        if local_path is not None:
+            try:
+                with open(local_path, 'rb') as f:
+                    return f.read()
+            except OSError:
+                # Evicted by another process sharing the cache, copied again below
+                self.remove(key)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        file_name = key + '.xml'
+        with open(os.path.join(self.location, file_name), 'wb') as f:
+            f.write(data)
+        self.add(key, file_name)
+        return data
+
+    def get_files(self, file_list):
+        '''
+        Returns list of local paths for file_list (same order).
+        '''
+        return [self.get(f) for f in file_list]
+
+
+class ResultCache(FileCache):
+    '''
+    Persistent cache of extracted results for each Test Result file (XML).
+
+    Entries are compressed NumPy (.npz) files keyed by source path, size, modification time,
+    the requested tests and dtype, so a changed file or a different request is parsed again.
+    '''
+
+    def __init__(self, location='~/tmp_HotChuck_results', max_bytes=1024**3):
+        super().__init__(location, max_bytes)
+
+    def key(self, path, list_of_tests, dtype, shape):
+        '''
+        Returns cache key for file and request. shape is the (Rows, Columns) of one ASIC.
+        '''
+        return self.fingerprint(path, list_of_tests, np.dtype(dtype).name, list(shape))
+
+    def get(self, key):
+        '''
+        Returns (info, data) stored for key or None if not cached.
+        Format matches parse_data.extract_arrays.
+        '''
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            with np.load(path) as npz:
+                meta = json.loads(str(npz['meta']))
+                data = {test: (result, npz[f'a{i}'])
+                        for i, (test, result) in enumerate(meta['tests'])}
+        except (OSError, ValueError, KeyError):
+            self.remove(key)
+            return None
+        return meta['info'], data
+
+    def put(self, key, info, data):
+        '''
+        Stores (info, data) from parse_data.extract_arrays under key.
+        '''
+        meta = {'info': info, 'tests': [[test, result]
+                                        for test, (result, _) in data.items()]}
+        arrays = {f'a{i}': elements for i, (_, elements)
+                  in enumerate(data.values())}
+        file_name = key + '.npz'
+        tmp_path = os.path.join(self.location, f'{key}.{os.getpid()}.tmp.npz')
+        np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, os.path.join(self.location, file_name))
+        self.add(key, file_name)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,180 @@
+import os
+from collections import namedtuple
+from datetime import datetime
+
+BASELINE = 'Baseline'
+ELEVATED = 'Elevated'
+STAGES = {'DIE TEST BASELINE': BASELINE, 'DIE TEST ELEVATED': ELEVATED}
+
+CatalogEntry = namedtuple('CatalogEntry', ['path', 'sfc', 'asic', 'stage', 'timestamp',
+                                           'aborted', 'sfc_probe', 'size', 'mtime'])
+
+
+def parse_file_name(path, size=None, mtime=None):
+    '''
+    Decodes Die Test file name fields.
+    i.e. "R0EQLE 001_006-Die Test Elevated-05122022 144501.xml"
+
+    Parameters
+    ----------
+    path : Path
+        Test Result file (XML)
+    size : Integer
+        File size in bytes
+    mtime : Float
+        File modification time
+
+    Returns
+    -------
+    entry : CatalogEntry
+        None if file is not a Baseline or Elevated Die Test XML file.
+
+    '''
+    name = os.path.basename(path)
+    upper = name.upper()
+    if not upper.endswith('.XML'):
+        return None
+    stage = next((v for k, v in STAGES.items() if k in upper), None)
+    if stage is None:
+        return None
+
+    fields = name.split('-')
+    try:
+        timestamp = datetime.strptime(
+            fields[2].strip()[:15], '%m%d%Y %H%M%S')
+    except (IndexError, ValueError):
+        timestamp = None
+
+    return CatalogEntry(path=path,
+                        sfc=fields[0].split('_')[0][:6].upper(),
+                        asic=fields[0][-8:].strip(),
+                        stage=stage,
+                        timestamp=timestamp,
+                        # Matches previous check on the full path
+                        aborted='ABORTED' in path.upper(),
+                        sfc_probe='-'.join(fields[0:2]).upper(),
+                        size=size,
+                        mtime=mtime)
+
+
+class FileCatalog():
+    '''
+    Index of Die Test XML files in location and all sub-folders of location.
+
+    The directory tree is walked once with os.scandir and file name fields are decoded once.
+    Entries can then be looked up by SFC and test stage.
+    '''
+
+    def __init__(self, location, entries=None):
+        self.location = location
+        # {SFC: {Stage: [CatalogEntry]}}
+        self.index = {}
+        if entries is None:
+            self.scan()
+        else:
+            # Catalog built from entries already found (i.e. one SFC of a larger catalog)
+            for entry in entries:
+                self.add(entry)
+
+    def scan(self):
+        '''
+        Walks location and rebuilds index.
+        '''
+        self.index = {}
+        stack = [self.location]
+        while stack:
+            folder = stack.pop()
+            try:
+                it = os.scandir(folder)
+            except OSError:
+                continue
+            with it:
+                for item in it:
+                    if item.name.startswith('.'):
+                        continue
+                    if item.is_dir():
+                        stack.append(item.path)
+                    elif item.is_file():
+                        self.add_file(item.path, item)
+
+    def add_file(self, path, dir_entry=None):
+        '''
+        Adds file to index if it is a Die Test XML file.
+
+        Parameters
+        ----------
+        path : Path
+        dir_entry : os.DirEntry
+            Used for file size and modification time when given
+
+        Returns
+        -------
+        entry : CatalogEntry or None
+
+        '''
+        entry = parse_file_name(path)
+        if entry is None:
+            return None
+        st = dir_entry.stat() if dir_entry is not None else os.stat(path)
+        entry = entry._replace(size=st.st_size, mtime=st.st_mtime)
+        self.add(entry)
+        return entry
+
+    def add(self, entry):
+        stages = self.index.setdefault(entry.sfc, {BASELINE: [], ELEVATED: []})
+        stages[entry.stage].append(entry)
+
+    def sfcs(self, since=None):
+        '''
+        Returns sorted list of SFCs in catalog.
+
+        Parameters
+        ----------
+        since : datetime
+            Only SFCs with a test file timestamp on or after since.
+
+        '''
+        if since is None:
+            return sorted(self.index)
+        return sorted(sfc for sfc, stages in self.index.items()
+                      if any(x.timestamp is not None and x.timestamp >= since
+                             for entries in stages.values() for x in entries))
+
+    def entries(self, sfc, stage=None, include_aborted=False):
+        '''
+        Returns catalog entries for SFC.
+
+        Parameters
+        ----------
+        sfc : String
+            SFC of Wafer (or leading characters of SFC)
+        stage : String
+            BASELINE, ELEVATED or None for both
+        include_aborted : Boolean
+            Include files with "Aborted" in name
+
+        Returns
+        -------
+        entries : List of CatalogEntry
+            Baseline entries followed by Elevated entries.
+
+        '''
+        sfc = sfc.strip().upper()
+        if len(sfc) == 6:
+            matches = [self.index[sfc]] if sfc in self.index else []
+        else:
+            matches = [v for k, v in self.index.items() if k.startswith(sfc)]
+
+        stages = [stage] if stage is not None else [BASELINE, ELEVATED]
+        return [x for s in stages for by_stage in matches for x in by_stage[s]
+                if include_aborted or not x.aborted]
+
+    def files(self, sfc, stage=None):
+        '''
+        Returns list of file paths for SFC (Aborted files removed).
+        '''
+        return [x.path for x in self.entries(sfc, stage)]
+
+
+if __name__ == '__main__':
+    pass
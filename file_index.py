@@ -0,0 +1,189 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from file_catalog import BASELINE, ELEVATED, CatalogEntry, parse_file_name
+
+
+class FileIndex():
+    '''
+    Persistent SQLite index of Die Test XML files in location and all sub-folders of location.
+
+    refresh() only lists folders whose modification time changed since the last refresh, so
+    looking up the files for one SFC is an indexed query instead of a walk over the whole share.
+    Has the same lookup methods as file_catalog.FileCatalog and can be passed to Parser as catalog.
+
+    Several locations can share one database file; lookups only return files under location.
+
+    Note: a file overwritten in place does not change its folder's modification time and is
+    not picked up until that folder changes.
+    '''
+
+    def __init__(self, location, db_path='~/tmp_HotChuck_index.db', refresh=True):
+        self.location = location
+        self.db_path = os.path.abspath(os.path.expanduser(db_path))
+        # Prefix of every file path under location (substr comparison, no LIKE wildcards)
+        self.prefix = os.path.join(os.path.abspath(location), '')
+        self.conn = sqlite3.connect(self.db_path)
+        self.create_tables()
+        if refresh:
+            self.refresh()
+
+    def create_tables(self):
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS folders '
+                              '(path TEXT PRIMARY KEY, mtime REAL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS files '
+                              '(path TEXT PRIMARY KEY, folder TEXT, sfc TEXT, asic TEXT, stage TEXT, '
+                              'timestamp TEXT, aborted INTEGER, sfc_probe TEXT, size INTEGER, mtime REAL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS files_sfc ON files (sfc, stage)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS files_folder ON files (folder)')
+
+    def refresh(self):
+        '''
+        Rescans folders that are new or whose modification time changed and drops folders that
+        no longer exist.
+
+        Returns
+        -------
+        scanned : Integer
+            Number of folders listed
+
+        '''
+        root = os.path.abspath(self.location)
+        known = {path: mtime for path, mtime in self.conn.execute('SELECT path, mtime FROM folders')
+                 if path == root or path.startswith(root + os.sep)}
+
+        queue = list(known) if root in known else [root]
+        scanned = 0
+        with self.conn:
+            while queue:
+                folder = queue.pop()
+                try:
+                    mtime = os.stat(folder).st_mtime
+                except OSError:
+                    self.remove_folder(folder)
+                    continue
+                if known.get(folder) == mtime:
+                    continue
+
+                known[folder] = mtime
+                queue.extend(x for x in self.scan_folder(folder, mtime)
+                             if x not in known)
+                scanned += 1
+        return scanned
+
+    def scan_folder(self, folder, mtime):
+        '''
+        Replaces index rows of folder with its current files.
+
+        Returns
+        -------
+        sub_folders : List of Paths
+
+        '''
+        sub_folders = []
+        rows = []
+        try:
+            it = os.scandir(folder)
+        except OSError:
+            return sub_folders
+        with it:
+            for item in it:
+                if item.name.startswith('.'):
+                    continue
+                if item.is_dir():
+                    sub_folders.append(item.path)
+                elif item.is_file():
+                    entry = parse_file_name(item.path)
+                    if entry is None:
+                        continue
+                    st = item.stat()
+                    rows.append((entry.path, folder, entry.sfc, entry.asic, entry.stage,
+                                 entry.timestamp.isoformat() if entry.timestamp else None,
+                                 int(entry.aborted), entry.sfc_probe, st.st_size, st.st_mtime))
+
+        self.conn.execute('DELETE FROM files WHERE folder = ?', (folder,))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO folders VALUES (?, ?)', (folder, mtime))
+        return sub_folders
+
+    def remove_folder(self, folder):
+        self.conn.execute('DELETE FROM files WHERE folder = ?', (folder,))
+        self.conn.execute('DELETE FROM folders WHERE path = ?', (folder,))
+
+    def to_entry(self, row):
+        path, sfc, asic, stage, timestamp, aborted, sfc_probe, size, mtime = row
+        return CatalogEntry(path=path, sfc=sfc, asic=asic, stage=stage,
+                            timestamp=datetime.fromisoformat(
+                                timestamp) if timestamp else None,
+                            aborted=bool(aborted), sfc_probe=sfc_probe, size=size, mtime=mtime)
+
+    def sfcs(self, since=None):
+        '''
+        Returns sorted list of SFCs in index.
+
+        Parameters
+        ----------
+        since : datetime
+            Only SFCs with a test file timestamp on or after since.
+
+        '''
+        where, args = 'substr(path, 1, ?) = ?', [len(self.prefix), self.prefix]
+        if since is not None:
+            where += ' AND timestamp >= ?'
+            args.append(since.isoformat())
+        rows = self.conn.execute(f'SELECT DISTINCT sfc FROM files WHERE {where} ORDER BY sfc', args)
+        return [x[0] for x in rows]
+
+    def entries(self, sfc, stage=None, include_aborted=False):
+        '''
+        Returns index entries for SFC.
+
+        Parameters
+        ----------
+        sfc : String
+            SFC of Wafer (or leading characters of SFC)
+        stage : String
+            BASELINE, ELEVATED or None for both
+        include_aborted : Boolean
+            Include files with "Aborted" in name
+
+        Returns
+        -------
+        entries : List of CatalogEntry
+            Baseline entries followed by Elevated entries.
+
+        '''
+        sfc = sfc.strip().upper()
+        if len(sfc) == 6:
+            where, args = 'sfc = ?', [sfc]
+        else:
+            where, args = 'substr(sfc, 1, ?) = ?', [len(sfc), sfc]
+        where += ' AND substr(path, 1, ?) = ?'
+        args += [len(self.prefix), self.prefix]
+
+        entries = []
+        for s in ([stage] if stage is not None else [BASELINE, ELEVATED]):
+            query = ('SELECT path, sfc, asic, stage, timestamp, aborted, sfc_probe, size, mtime '
+                     f'FROM files WHERE {where} AND stage = ?')
+            if not include_aborted:
+                query += ' AND aborted = 0'
+            rows = self.conn.execute(query + ' ORDER BY path', args + [s])
+            entries.extend(self.to_entry(x) for x in rows)
+        return entries
+
+    def files(self, sfc, stage=None):
+        '''
+        Returns list of file paths for SFC (Aborted files removed).
+        '''
+        return [x.path for x in self.entries(sfc, stage)]
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    pass
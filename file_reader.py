@@ -0,0 +1,122 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ByteBudget():
+    '''
+    Bytes held by prefetched files. Reservations are granted in file order, so a later file can
+    never take the memory the next file to be parsed is waiting for.
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.held = 0
+        self.turn = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def acquire(self, ticket, size):
+        '''
+        Waits until it is ticket's turn and size bytes are free (a file larger than max_bytes
+        only waits for all other files to be released).
+
+        Returns
+        -------
+        size : Integer
+            Bytes reserved, 0 if budget was closed.
+
+        '''
+        size = min(size, self.max_bytes)
+        with self.cond:
+            self.cond.wait_for(lambda: self.closed or (
+                self.turn == ticket and self.held + size <= self.max_bytes))
+            if self.closed:
+                return 0
+            self.held += size
+            self.turn += 1
+            self.cond.notify_all()
+        return size
+
+    def release(self, size):
+        with self.cond:
+            self.held -= size
+            self.cond.notify_all()
+
+    def close(self):
+        # Wakes all waiting reads so the thread pool can shut down
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class PrefetchReader():
+    '''
+    Reads files ahead of the caller in a thread pool, for shares where every open and read has
+    high latency. Iterating yields (path, bytes) in file_list order; at most max_bytes of file
+    contents are held at a time (read ahead or not yet released by the caller).
+    The contents of a file are released when the next file is requested.
+
+    Parameters
+    ----------
+    file_list : List of Paths
+    threads : Integer
+        Number of concurrent reads
+    max_bytes : Integer
+        Memory limit of read ahead files
+    read : Function
+        Returns contents of a path (default: read whole file). i.e. MirrorCache.get_bytes
+
+    '''
+
+    def __init__(self, file_list, threads=4, max_bytes=64 * 1024**2, read=None):
+        self.file_list = list(file_list)
+        self.threads = max(1, threads)
+        self.max_bytes = max_bytes
+        self.read = read if read is not None else read_bytes
+
+    def load(self, budget, ticket, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            # Error is raised by read below
+            size = 0
+        reserved = budget.acquire(ticket, size)
+        if budget.closed:
+            # Caller stopped iterating
+            return None, 0
+        try:
+            return self.read(path), reserved
+        except BaseException:
+            budget.release(reserved)
+            raise
+
+    def __iter__(self):
+        budget = ByteBudget(self.max_bytes)
+        pool = ThreadPoolExecutor(max_workers=self.threads)
+        futures = deque()
+        reserved = 0
+        try:
+            # Reads are queued in order and wait in the budget, so queueing them all is cheap
+            for ticket, path in enumerate(self.file_list):
+                futures.append((path, pool.submit(self.load, budget, ticket, path)))
+            while futures:
+                path, future = futures.popleft()
+                data, reserved = future.result()
+                yield path, data
+                del data
+                budget.release(reserved)
+                reserved = 0
+        finally:
+            budget.close()
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    pass
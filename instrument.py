@@ -0,0 +1,218 @@
+'''
+Timing and memory instrumentation.
+
+Code is wrapped in named spans:
+
+    with instrument.span('parse', labels={'sfc': sfc}, files=len(file_list)) as s:
+        ...
+        s.add(bytes=size)
+    print(s.wall)
+
+Counts (keyword arguments and add) are summed by summary(); labels (i.e. SFC, worker count)
+describe the span and are only written to its record. Every span measures wall time, CPU time,
+peak RSS (high-water mark of the process so far, which never goes down) and how much the span
+raised that peak (0 when memory stayed below an earlier peak). Spans are only recorded once start() has been called
+(see active); each record is appended to a JSON lines file as it ends and kept for summary().
+'''
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    '''
+    Returns peak resident memory of this process in MiB (None if not available).
+    '''
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss) / 2**20
+
+
+class Span():
+    '''
+    One measured section of code. Use as a context manager (see span).
+    '''
+
+    def __init__(self, name, recorder=None, labels=None, **counts):
+        self.name = name
+        self.recorder = recorder
+        self.labels = dict(labels or {})
+        self.counts = dict(counts)
+        self.wall = 0.0
+        self.cpu = 0.0
+        # Process high-water mark at exit and increase of it during the span
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+
+    def add(self, **counts):
+        '''
+        Adds to counts of span. i.e. s.add(files=1, bytes=size)
+        '''
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_peak = peak_rss_mb()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self.start_wall
+        self.cpu = time.process_time() - self.start_cpu
+        self.peak_rss_mb = peak_rss_mb()
+        if self.peak_rss_mb is not None:
+            self.rss_growth_mb = self.peak_rss_mb - self.start_peak
+        if self.recorder is not None:
+            self.recorder.record(self, failed=exc_type is not None)
+        return False
+
+
+class Recorder():
+    '''
+    Collects span records and appends them to a JSON lines file.
+
+    Parameters
+    ----------
+    path : Path
+        JSON lines output file (None to only keep records in memory)
+
+    '''
+
+    def __init__(self, path=None):
+        self.path = os.path.abspath(path) if path else None
+        self.records = []
+        # Records of this run start at the current end of the file
+        self.offset = os.path.getsize(self.path) if self.path and os.path.exists(self.path) else 0
+
+    def record(self, span, failed=False):
+        record = OrderedDict([('name', span.name),
+                              ('time', time.time()),
+                              ('pid', os.getpid()),
+                              ('wall_s', round(span.wall, 6)),
+                              ('cpu_s', round(span.cpu, 6)),
+                              ('peak_rss_mb', None if span.peak_rss_mb is None
+                               else round(span.peak_rss_mb, 1)),
+                              ('rss_growth_mb', None if span.rss_growth_mb is None
+                               else round(span.rss_growth_mb, 1))])
+        record.update(span.labels)
+        record['counts'] = span.counts
+        if failed:
+            record['failed'] = True
+        self.records.append(record)
+        if self.path is not None:
+            # One short append per record, so forked worker processes can write to the same file
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def read(self):
+        '''
+        Returns records written to file since this Recorder was created
+        (records of this process only when there is no file).
+        '''
+        if self.path is None or not os.path.exists(self.path):
+            return self.records
+        with open(self.path) as f:
+            f.seek(self.offset)
+            return [json.loads(x, object_pairs_hook=OrderedDict) for x in f if x.strip()]
+
+    def summary(self):
+        '''
+        Returns text table of records grouped by span name
+        (calls, total wall and CPU seconds, process peak RSS, largest increase of the peak
+        during one call and summed counts).
+        Includes records of worker processes when they were written to the same file.
+        '''
+        groups = OrderedDict()
+        for record in self.read():
+            group = groups.setdefault(record['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                       'peak_rss_mb': None, 'rss_growth_mb': None,
+                                                       'counts': {}})
+            group['calls'] += 1
+            group['wall_s'] += record['wall_s']
+            group['cpu_s'] += record['cpu_s']
+            if record['peak_rss_mb'] is not None:
+                group['peak_rss_mb'] = max(group['peak_rss_mb'] or 0, record['peak_rss_mb'])
+            if record.get('rss_growth_mb') is not None:
+                group['rss_growth_mb'] = max(group['rss_growth_mb'] or 0, record['rss_growth_mb'])
+            for key, value in record['counts'].items():
+                group['counts'][key] = group['counts'].get(key, 0) + value
+
+        width = max([len(x) for x in groups] + [4])
+        lines = [f'{"Span":<{width}}  {"Calls":>6}  {"Wall s":>9}  {"CPU s":>9}  '
+                 f'{"Proc Peak MiB":>13}  {"Peak +MiB":>9}  Counts']
+        for name, group in groups.items():
+            peak, growth = ('' if group[x] is None else f'{group[x]:.1f}'
+                            for x in ('peak_rss_mb', 'rss_growth_mb'))
+            counts = ', '.join(f'{k}={v:g}' for k, v in group['counts'].items())
+            lines.append(f'{name:<{width}}  {group["calls"]:>6}  {group["wall_s"]:>9.3f}  '
+                         f'{group["cpu_s"]:>9.3f}  {peak:>13}  {growth:>9}  {counts}')
+        return '\n'.join(lines)
+
+
+# Recorder of this process (None when instrumentation is off)
+_recorder = None
+
+
+def start(path=None):
+    '''
+    Starts recording spans of this process (and of worker processes forked after this call).
+
+    Returns
+    -------
+    recorder : Recorder
+
+    '''
+    global _recorder
+    _recorder = Recorder(path)
+    return _recorder
+
+
+def stop():
+    '''
+    Stops recording and returns the Recorder (None if it was not started).
+    '''
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def active():
+    '''
+    Returns True while spans are recorded. i.e. to skip collecting counts that cost extra I/O.
+    '''
+    return _recorder is not None
+
+
+def span(name, labels=None, **counts):
+    '''
+    Returns Span context manager. Spans are always measured and only recorded after start().
+
+    Parameters
+    ----------
+    name : String
+    labels : Dictionary
+        Values describing the span (not summed by Recorder.summary). i.e. {'sfc': sfc}
+    counts : Numbers
+        Amounts processed by the span (summed by Recorder.summary). i.e. files=10
+
+    '''
+    return Span(name, _recorder, labels, **counts)
+
+
+if __name__ == '__main__':
+    pass
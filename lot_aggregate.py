@@ -0,0 +1,253 @@
+import json
+import os
+
+import numpy as np
+
+from wafer_data import WaferData
+from wafer_layout import WaferLayout
+
+# Stages aggregated for each channel (Baseline no longer performs Rx tests)
+CHANNEL_STAGES = {'Tx': ['Baseline', 'Elevated'], 'Rx': ['Elevated']}
+
+
+class RunningStats():
+    '''
+    Per element running count, mean, Welford sum of squared differences and fail count over
+    wafers, for every ASIC site of asic_list.
+    Memory use depends only on the layout, not on the number of wafers added.
+
+    Parameters
+    ----------
+    n_sites : Integer
+        Number of ASICs in asic_list
+    shape : Tuple
+        (Rows, Columns) of elements of one ASIC
+
+    '''
+
+    def __init__(self, n_sites, shape):
+        self.count = np.zeros(n_sites, dtype=np.int64)
+        self.mean = np.zeros((n_sites,) + tuple(shape))
+        self.m2 = np.zeros((n_sites,) + tuple(shape))
+        self.fails = np.zeros((n_sites,) + tuple(shape), dtype=np.int64)
+
+    def update(self, sites, values, limits):
+        '''
+        Adds one wafer.
+
+        Parameters
+        ----------
+        sites : Array
+            Site index (position in asic_list) of each ASIC of values
+        values : Array
+            (n_asics, Rows, Columns) normalized element values
+        limits : Tuple of Floats
+            (Lower, Upper) limits of normalized element value, elements outside count as fails
+
+        '''
+        self.count[sites] += 1
+        n = self.count[sites][:, None, None]
+        diff = values - self.mean[sites]
+        self.mean[sites] += diff / n
+        self.m2[sites] += diff * (values - self.mean[sites])
+        self.fails[sites] += (values < limits[0]) | (values > limits[1])
+
+    def std(self):
+        '''
+        Returns sample standard deviation of every element (NaN for sites with fewer than 2 wafers).
+        '''
+        n = self.count[:, None, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > 1, np.sqrt(self.m2 / (n - 1)), np.nan)
+
+    def fail_rate(self):
+        '''
+        Returns fraction of wafers with each element outside limits (NaN for sites without wafers).
+        '''
+        n = self.count[:, None, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > 0, self.fails / n, np.nan)
+
+
+class LotAggregate():
+    '''
+    Lot level composite of normalized element maps of one channel ('Tx' or 'Rx').
+
+    Each wafer is added once with add() and only updates running statistics, so adding a wafer
+    does not read the wafers already aggregated. Aggregates are stored with save() and
+    continued later with load().
+
+    Parameters
+    ----------
+    lot : String
+        Name of lot
+    channel : String
+        'Tx' or 'Rx'
+    layout : WaferLayout
+    limits : Tuple of Floats
+        Limits of normalized element value for fail rate
+        (default: color limits of the channel's wafer HeatMaps, see plot_wafers.channel_limits)
+
+    '''
+
+    def __init__(self, lot, channel, layout, limits=None):
+        if limits is None:
+            import plot_wafers
+            limits = plot_wafers.channel_limits(channel)
+        self.lot = lot
+        self.channel = channel
+        self.layout = layout
+        self.limits = tuple(limits)
+        self.test = None
+        self.sfcs = []
+        self.stages = {x: RunningStats(len(layout.asic_list), layout.asic_shape)
+                       for x in CHANNEL_STAGES[channel]}
+
+    def add(self, sfc, results):
+        '''
+        Adds one wafer. A wafer already in the aggregate is skipped.
+
+        Parameters
+        ----------
+        sfc : String
+            SFC of Wafer
+        results : Dictionary of {Stage:WaferData}
+            Results of the channel's test for each stage. i.e. from Parser.process_data
+
+        Returns
+        -------
+        added : Boolean
+
+        '''
+        if sfc in self.sfcs:
+            print(f'{sfc} is already in lot {self.lot}.')
+            return False
+
+        for stage, stats in self.stages.items():
+            data = results[stage]
+            if self.test is None:
+                self.test = data.test
+            elif data.test != self.test:
+                raise ValueError(f'{sfc}: {stage} test {data.test} does not match lot test {self.test}.')
+            asics = [x for x in data.asics() if x in self.layout.site_index]
+            sites = np.array([self.layout.site_index[x] for x in asics], dtype=np.intp)
+            rows = np.array([data.asic_index[x] for x in asics], dtype=np.intp)
+            stats.update(sites, data.normalized()[rows], self.limits)
+        self.sfcs.append(sfc)
+        return True
+
+    def to_wafer_data(self, stage, statistic):
+        '''
+        Returns statistic of stage as WaferData (one entry per ASIC with at least one wafer)
+        so it can be plotted like a wafer.
+
+        Parameters
+        ----------
+        stage : String
+        statistic : String
+            'Mean', 'Std' or 'Fail Rate'
+
+        '''
+        stats = self.stages[stage]
+        values = {'Mean': lambda: stats.mean, 'Std': stats.std,
+                  'Fail Rate': stats.fail_rate}[statistic]()
+        present = np.flatnonzero(stats.count > 0)
+        data = WaferData.allocate(self.test, len(present), values.dtype, self.layout.asic_shape)
+        data.elements[...] = values[present]
+        data.set_meta([{'ProductSN': self.layout.asic_list[i], 'Wafers': int(stats.count[i])}
+                       for i in present])
+        return data
+
+    def save(self, path):
+        '''
+        Writes aggregate to a NumPy .npz file (replaced atomically).
+        '''
+        meta = {'lot': self.lot, 'channel': self.channel, 'test': self.test, 'sfcs': self.sfcs,
+                'limits': list(self.limits), 'asic_list': self.layout.asic_list,
+                'wafer': [self.layout.rows, self.layout.cols],
+                'asic_shape': list(self.layout.asic_shape)}
+        arrays = {f'{stage}_{name}': getattr(stats, name) for stage, stats in self.stages.items()
+                  for name in ['count', 'mean', 'm2', 'fails']}
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, layout=None, limits=None):
+        '''
+        Reads aggregate written by save().
+
+        Parameters
+        ----------
+        path : Path
+        layout : WaferLayout
+            Checked against the layout the aggregate was created with (None to use that layout)
+        limits : Tuple of Floats
+            Checked against the fail rate limits of the aggregate
+            (default: color limits of the channel's wafer HeatMaps)
+
+        Raises
+        ------
+        ValueError
+            Aggregate was created with a different layout or different limits.
+
+        '''
+        with np.load(path) as npz:
+            meta = json.loads(str(npz['meta']))
+            stored = WaferLayout(meta['asic_list'], *meta['wafer'], *meta['asic_shape'])
+            if layout is not None and (layout.asic_list != stored.asic_list or
+                                       (layout.rows, layout.cols, layout.asic_shape) !=
+                                       (stored.rows, stored.cols, stored.asic_shape)):
+                raise ValueError(f'Lot aggregate "{path}" was created with a different wafer layout.')
+            if limits is None:
+                import plot_wafers
+                limits = plot_wafers.channel_limits(meta['channel'])
+            if tuple(meta['limits']) != tuple(limits):
+                raise ValueError(f'Lot aggregate "{path}" was created with fail rate limits '
+                                 f'{tuple(meta["limits"])}, expected {tuple(limits)}.')
+            aggregate = cls(meta['lot'], meta['channel'], stored, meta['limits'])
+            aggregate.test = meta['test']
+            aggregate.sfcs = meta['sfcs']
+            for stage, stats in aggregate.stages.items():
+                for name in ['count', 'mean', 'm2', 'fails']:
+                    setattr(stats, name, npz[f'{stage}_{name}'])
+        return aggregate
+
+    def plot(self, location, raster=False):
+        '''
+        Saves one HeatMap per statistic (Mean, Std and Fail Rate) with one panel per stage.
+
+        Returns
+        -------
+        names : List of Strings
+            Names used in place of SFC in the output file names. i.e. 'LOT1 Lot Mean'
+
+        '''
+        import plot_wafers
+
+        # Mean uses the color limits of the channel's wafer HeatMaps
+        channel_panels = {x.stage: x for x in (plot_wafers.TX_PANELS if self.channel == 'Tx'
+                                               else plot_wafers.RX_PANELS)}
+        names = []
+        for statistic in ['Mean', 'Std', 'Fail Rate']:
+            data = {}
+            panels = []
+            for stage in self.stages:
+                data[(self.channel, stage)] = self.to_wafer_data(stage, statistic)
+                title = f'{stage} {statistic} ({len(self.sfcs)} wafers)'
+                if statistic == 'Mean':
+                    panel = channel_panels[stage]
+                    panels.append(panel._replace(title=title, normalize=False))
+                else:
+                    panels.append(plot_wafers.PanelSpec(title, self.channel, stage, 0,
+                                                        0.25 if statistic == 'Std' else 1, False,
+                                                        colorbar=True))
+            name = f'{self.lot} Lot {statistic}'
+            plot_wafers.Plotter(data, panels, location, self.layout.asic_list, name, raster,
+                                self.layout, title=f'Lot {statistic} of Normalized Elements').plot_wafers()
+            names.append(name)
+        return names
+
+
+if __name__ == '__main__':
+    pass
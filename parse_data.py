@@ -1,19 +1,273 @@
-import glob
+import io
 import os
 import sys
-import shutil
-import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import repeat
 
 import lxml.etree as ET
+import numpy as np
 import pandas as pd
 
+import instrument
+from file_catalog import FileCatalog
+from file_reader import PrefetchReader
+from wafer_data import WaferData
+from wafer_layout import ASIC_COLS, ASIC_ROWS, WaferLayout
+
+SETUP_FIELDS = ['Timestamp', 'ReportRevision', 'Operator', 'Equipment', 'PlatformTestSW',
+                'ProductTestSW', 'Product', 'ProcessStep', 'LotNumber', 'ProductSN']
+SUMMARY_FIELDS = ['OverallResult']
+
+
+def test_key(test):
+    '''
+    Returns Dictionary key for [Test, Measurement] pair. i.e. 'Tx Element Peak-Peak___Pk-Pk'
+    '''
+    return test[0] + '___' + test[1]
+
+
+# Bytes passed to the XML parser at a time (reading stops within one chunk of the last needed entry)
+READ_CHUNK = 64 * 1024
+
+
+class DetailTarget():
+    '''
+    lxml parser target that keeps only the Setup and Summary fields and the Groups of requested
+    Detail Entries. No element tree is built: text is only collected for the fields that are
+    kept, and Groups of an Entry whose Name is not requested are skipped as they are read.
+
+    Parameters
+    ----------
+    list_of_tests : List of [Test, Measurement]
+
+    '''
+
+    def __init__(self, list_of_tests):
+        self.wanted = {(x[0], x[1]): test_key(x) for x in list_of_tests}
+        self.names = {x[0] for x in list_of_tests}
+        # (Name, Measurement) pairs not found yet (an Entry may lack some of its Measurements)
+        self.remaining = set(self.wanted)
+        self.fields = {'Setup': {}, 'Summary': {}}
+        # Setup and Summary sections whose end tag has been read
+        self.closed = set()
+        self.results = {test_key(x): {'TestResult': None, 'Values': []}
+                        for x in list_of_tests}
+        # Tags from the root to the current element
+        self.path = []
+        # Text chunks of the element being kept (None when text is not needed)
+        self.text = None
+        # Depth inside a skipped subtree (0 = not skipping)
+        self.skip = 0
+        # Name, Result and [Measurement, Values] of each Group of the current Entry
+        self.entry = None
+        self.entry_depth = None
+
+    @property
+    def done(self):
+        '''
+        True once Setup, Summary (up to their end tags) and every requested Entry have been read.
+        '''
+        return not self.remaining and len(self.closed) == len(self.fields)
+
+    def start(self, tag, attrib):
+        if self.skip:
+            self.skip += 1
+            return
+        path = self.path
+        path.append(tag)
+        depth = len(path)
+
+        if self.entry is not None:
+            level = depth - self.entry_depth
+            if level == 1 and tag in ('Name', 'Result'):
+                self.text = []
+            elif level == 1 and tag == 'Group':
+                if self.entry['Name'] is not None and self.entry['Name'] not in self.names:
+                    path.pop()
+                    self.skip = 1
+                    return
+                self.entry['Groups'].append([None, []])
+            elif level == 2 and tag == 'Measurement' and path[-2] == 'Group':
+                self.text = []
+            elif level == 3 and tag == 'Value' and path[-2] == 'Record':
+                self.text = []
+        elif depth == 3 and path[1] in self.fields:
+            self.text = []
+        elif depth > 1 and tag == 'Entry' and path[-2] == 'Detail':
+            self.entry = {'Name': None, 'Result': None, 'Groups': []}
+            self.entry_depth = depth
+
+    def data(self, data):
+        if self.text is not None:
+            self.text.append(data)
+
+    def end(self, tag):
+        if self.skip:
+            self.skip -= 1
+            return
+        path = self.path
+        depth = len(path)
+
+        if self.text is not None:
+            text = ''.join(self.text)
+            self.text = None
+            if self.entry is None:
+                # First occurrence of a Setup or Summary field, as findtext
+                self.fields[path[1]].setdefault(tag, text)
+            else:
+                level = depth - self.entry_depth
+                if level == 1:
+                    if self.entry[tag] is None:
+                        self.entry[tag] = text
+                elif level == 2:
+                    self.entry['Groups'][-1][0] = text
+                else:
+                    self.entry['Groups'][-1][1].append(text)
+        elif self.entry is not None and depth == self.entry_depth:
+            self.end_entry()
+        elif depth == 2 and tag in self.fields:
+            self.closed.add(tag)
+        path.pop()
+
+    def end_entry(self):
+        entry = self.entry
+        self.entry = None
+        name = entry['Name']
+        if name not in self.names:
+            return
+        for measurement, values in entry['Groups']:
+            key = self.wanted.get((name, measurement))
+            if key is None:
+                continue
+            self.results[key]['TestResult'] = entry['Result']
+            self.results[key]['Values'].extend(values)
+            self.remaining.discard((name, measurement))
+
+    def close(self):
+        info = {field: self.fields['Setup'].get(field) for field in SETUP_FIELDS}
+        info.update((field, self.fields['Summary'].get(field)) for field in SUMMARY_FIELDS)
+        return info, self.results
+
+
+def extract_xml(source, list_of_tests, stop_early=True):
+    '''
+    Reads a test result file (XML) in a single streaming pass and gathers the Setup and Summary
+    fields plus the data for every requested test (see DetailTarget). No element tree is built,
+    and by default reading stops as soon as Setup, Summary and all requested Entries were seen,
+    so the other test entries after them are never read.
+
+    Parameters
+    ----------
+    source : Path or file object
+        Test Result file (XML)
+    list_of_tests : List of [Test, Measurement]
+    stop_early : Boolean
+        Stop reading once everything requested was found (False = read and check the whole file)
+
+    Returns
+    -------
+    info : Dictionary
+        Setup and Summary fields
+    data : Dictionary of {Test:Dictionary} Pairs
+        'TestResult' and list of element 'Values' (in Record order) for each test
+
+    '''
+    target = DetailTarget(list_of_tests)
+    parser = ET.XMLParser(target=target)
+
+    f = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            if stop_early and target.done:
+                # Rest of the file is not needed (parser is left unfinished)
+                return target.close()
+        return parser.close()
+    except ET.XMLSyntaxError as e:
+        if f is source:
+            raise
+        # Fed data has no file name, error names the file like ET.parse
+        raise ET.XMLSyntaxError(e.msg, e.code, e.lineno, e.offset, str(source)) from None
+    finally:
+        if f is not source:
+            f.close()
+
+
+def extract_arrays(source, list_of_tests, dtype=np.float64, shape=(ASIC_ROWS, ASIC_COLS)):
+    '''
+    Runs extract_xml on one file and converts the element values of each test to a (Rows, Columns) array.
+    Module level so it can be sent to worker processes; only small dictionaries and arrays are
+    returned.
+
+    Parameters
+    ----------
+    source : Path or file object
+        Test Result file (XML), i.e. io.BytesIO of contents read ahead by PrefetchReader
+    list_of_tests : List of [Test, Measurement]
+    dtype : NumPy dtype
+        float64 or float32
+    shape : Tuple
+        (Rows, Columns) of elements of one ASIC. i.e. WaferLayout.asic_shape
+
+    Raises
+    ------
+    ValueError
+        Test does not have Rows x Columns elements.
+
+    Returns
+    -------
+    info : Dictionary
+        Setup and Summary fields
+    data : Dictionary of {Test:(TestResult, Array)} Pairs
+
+    '''
+    with instrument.span('parse_file', files=1) as s:
+        # File size costs a round trip on a network share, only looked up when recording
+        if isinstance(source, str) and instrument.active():
+            s.add(bytes=os.path.getsize(source))
+        elif isinstance(source, io.BytesIO):
+            s.add(bytes=source.getbuffer().nbytes)
+        info, data = extract_xml(source, list_of_tests)
+
+    arrays = {}
+    for key, entry in data.items():
+        values = entry['Values']
+        if len(values) != shape[0] * shape[1]:
+            raise ValueError(f'{info.get("ProductSN")}: {key} has {len(values)} elements, '
+                             f'expected {shape[0] * shape[1]} ({shape[0]} x {shape[1]}).')
+        arrays[key] = (entry['TestResult'],
+                       np.array(values, dtype=dtype).reshape(shape))
+    return info, arrays
+
 
 class Parser():
-    def __init__(self, location, asic_list, sfc):
+    def __init__(self, location, asic_list, sfc, dtype=np.float64, workers=1, mirror_cache=None,
+                 result_cache=None, catalog=None, layout=None, prefetch=0,
+                 prefetch_bytes=64 * 1024**2):
         self.location = location
         self.asic_list = asic_list
+        # wafer_layout.WaferLayout of the product (default 9 x 13 wafer of 40 x 75 ASICs)
+        self.layout = layout if layout is not None else WaferLayout(asic_list)
         self.sfc = sfc
+        # Type of parsed element values, a NumPy dtype or its name (i.e. 'float32')
+        self.dtype = np.dtype(dtype)
+        # Number of processes used for parsing (1 = serial)
+        # Scripts using workers > 1 need an "if __name__ == '__main__':" guard on Windows
+        self.workers = workers
+        # Optional file_cache.MirrorCache for reading from a local copy of a network share
+        self.mirror_cache = mirror_cache
+        # Optional file_cache.ResultCache of previously parsed files
+        self.result_cache = result_cache
+        # file_catalog.FileCatalog of location (built on first use when not given)
+        self.catalog = catalog
+        # Threads reading files ahead of a serial parse (0 = read each file when it is parsed)
+        # and memory limit of files read ahead (see file_reader.PrefetchReader)
+        self.prefetch = prefetch
+        self.prefetch_bytes = prefetch_bytes
 
     def process_data(self):
         '''
@@ -32,97 +286,86 @@ class Parser():
 
         Returns
         -------
-        df_amb : DataFrame
-            DataFrame of Baseline Results
-        df_hot : DataFrame
-            DataFrame of Elevated Results
+        df_amb : Dictionary of {Test:WaferData}
+            Baseline Tx Results
+        df_hot : Dictionary of {Test:WaferData}
+            Elevated Tx Results
+        df_rx : Dictionary of {Test:WaferData}
+            Elevated Rx Results
 
         '''
-        start_start = time.time()
-        self.check_sfc()
-
-        start_time = time.time()
-        # Collect Files at Input Directory
-        file_list = self.collect_files(self.location, self.sfc)
-        print('File Collection took {0:.0f} seconds.'.format(
-            time.time() - start_time))
-
-        start_time = time.time()
-        # Sort Files into Elevated and Baseline Lists
-        list_amb, list_hot = self.sort_files(file_list)
-        print('File Sort took {0:.0f} seconds.'.format(
-            time.time() - start_time))
-        print(f'Found {len(list_amb)} Baseline Test Data files.')
-        print(f'Found {len(list_hot)} Elevated Test Data files.')
-
-        # Check Dataset --> Do all  ASIC (that are used) datasets exist for both elevated and baseline?
-        data_check, list_amb, list_hot, asic_list_len, count_in_amb, count_in_hot = self.check_dataset(self.asic_list,
-                                                                                                       list_amb, list_hot)
-        if data_check == False:
-            print(f'Results were not found for {asic_list_len} ASICs of Baseline and Elevated Tests.\
-                    \nBaseline Files: {count_in_amb}\
-                    \nElevated Files: {count_in_hot}\
-                    \nPlease contact Engineering for support.')
-            sys.exit(1)
-
-        print(
-            f'Found {len(list_amb)} Baseline Test Data files that match ASIC List.')
-        print(
-            f'Found {len(list_hot)} Elevated Test Data files that match ASIC List.')
-
-        # Checks for Temp Folder
-        path = self.check_temp_folder()
-
-        start_time = time.time()
-        # Copies files in Amb and Elevated Lists to Temp Folder on Hard Drive
-        self.copy_files(list_amb, path, 'Baseline')
-        self.copy_files(list_hot, path, 'Elevated')
-        print('File Copy took {0:.0f} seconds.'.format(
-            time.time() - start_time))
-
-        # Collects file paths for Temp Folder Files and resorts int Amb and Elevated Lists
-        list_amb, list_hot = self.collect_copy_files(path)
-
-        start_time = time.time()
-        # Creates List of Tests
-        test_list_tx = self.create_test_list('Tx')
-        test_list_rx = self.create_test_list('Rx')
-        # Parses XML files on hard drive to create dictionary entries for each test
-        df_amb = self.create_data_dict(
-            list_amb, test_list_tx, 'Baseline', 'Tx')
-        df_hot = self.create_data_dict(
-            list_hot, test_list_tx, 'Elevated', 'Tx')
-        df_rx = self.create_data_dict(list_hot, test_list_rx, 'Elevated', 'Rx')
-        self.keys_match(df_amb, df_hot)
-        print('Data Parsing took {0:.0f} seconds.'.format(
-            time.time() - start_time))
-
-        start_time = time.time()
-        # Deletes Temp Folder and all files within
-        self.delete_files(path)
-        print('Deleting Files took {0:.0f} seconds.'.format(
-            time.time() - start_time))
-
-        end_end = time.time()
-        duration = end_end-start_start
+        with instrument.span('process_data', {'sfc': self.sfc}) as total:
+            self.check_sfc()
+
+            # Collect Files at Input Directory
+            with instrument.span('collect') as s:
+                file_list = self.collect_files(self.location, self.sfc)
+                s.add(files=len(file_list))
+            print('File Collection took {0:.0f} seconds.'.format(s.wall))
+
+            # Sort Files into Elevated and Baseline Lists
+            with instrument.span('sort', files=len(file_list)) as s:
+                list_amb, list_hot = self.sort_files(file_list)
+            print('File Sort took {0:.0f} seconds.'.format(s.wall))
+            print(f'Found {len(list_amb)} Baseline Test Data files.')
+            print(f'Found {len(list_hot)} Elevated Test Data files.')
+
+            # Check Dataset --> Do all  ASIC (that are used) datasets exist for both elevated and baseline?
+            data_check, list_amb, list_hot, asic_list_len, count_in_amb, count_in_hot = self.check_dataset(self.asic_list,
+                                                                                                           list_amb, list_hot)
+            if data_check == False:
+                print(f'Results were not found for {asic_list_len} ASICs of Baseline and Elevated Tests.\
+                        \nBaseline Files: {count_in_amb}\
+                        \nElevated Files: {count_in_hot}\
+                        \nPlease contact Engineering for support.')
+                sys.exit(1)
+
+            print(
+                f'Found {len(list_amb)} Baseline Test Data files that match ASIC List.')
+            print(
+                f'Found {len(list_hot)} Elevated Test Data files that match ASIC List.')
+
+            with instrument.span('parse', files=len(list_amb) + len(list_hot)) as s:
+                # Creates List of Tests
+                test_list_tx = self.create_test_list('Tx')
+                test_list_rx = self.create_test_list('Rx')
+                # Parses XML files to create dictionary entries for each test
+                # Elevated files are read once for both Tx and Rx tests
+                df_amb = self.create_data_dict(list_amb, test_list_tx, 'Baseline')
+                df_hot_all = self.create_data_dict(
+                    list_hot, test_list_tx + test_list_rx, 'Elevated')
+                df_hot = {test_key(x): df_hot_all[test_key(x)] for x in test_list_tx}
+                df_rx = {test_key(x): df_hot_all[test_key(x)] for x in test_list_rx}
+                self.keys_match(df_amb, df_hot)
+            print('Data Parsing took {0:.0f} seconds.'.format(s.wall))
+
+            # Evicts least recently used cache entries over the size limit
+            with instrument.span('cache_save'):
+                if self.mirror_cache is not None:
+                    self.mirror_cache.save()
+                if self.result_cache is not None:
+                    self.result_cache.save()
+
+        duration = total.wall
         print('Total Time: {0:.0f} minutes and {1:.0f} seconds'.format(
             duration//60, duration % 60))
 
         return df_amb, df_hot, df_rx
 
     def check_sfc(self):
-        file_list = self.collect_files(self.location, self.sfc)
-        bases = [os.path.basename(x).split('-')[0].split('_')[0]
-                 for x in file_list]
-        sfcs = list(set(bases))
-        sfcs = [x[:6] for x in sfcs]
-        sfcs = list(set(sfcs))
-
-        if len(sfcs) < 1:
+        if len(self.get_catalog(self.location).entries(self.sfc)) < 1:
             print('No SFC matching that value')
             sys.exit(1)
         return
 
+    def get_catalog(self, location):
+        '''
+        Returns FileCatalog of location. The directory tree is only walked the first time.
+        '''
+        if self.catalog is None or self.catalog.location != location:
+            self.catalog = FileCatalog(location)
+        return self.catalog
+
     def collect_files(self, location, sfc):
         '''
         Gather files that match SFC and Die Tests in location provided location and all sub-folders of location.
@@ -138,20 +381,10 @@ class Parser():
         Returns
         -------
         file_list : List of Paths
-            File List of Elevated and Baseline XML files
+            File List of Elevated and Baseline XML files (files with "Aborted" in name removed)
 
         '''
-        sfc = sfc.strip().upper()
-        path = location + '\\**\\' + sfc + '*' + 'Die Test Baseline' + '*' + '.xml'
-        file_list_amb = glob.glob(path, recursive=True)
-        path = location + '\\**\\' + sfc + '*' + 'Die Test Elevated' + '*' + '.xml'
-        file_list_hot = glob.glob(path, recursive=True)
-        file_list = file_list_amb + file_list_hot
-
-        # Remove files that have "Aborted" in name
-        file_list = [x for x in file_list if "ABORTED" not in x.upper()]
-
-        return file_list
+        return self.get_catalog(location).files(sfc)
 
     def sort_files(self, file_list):
         '''
@@ -169,46 +402,24 @@ class Parser():
             File List of Elevated Test Results (XML)
 
         '''
-        file_paths = [os.path.abspath(x) for x in file_list]
-        split_list = [os.path.split(x)[-1] for x in file_list]
-        sfc_probe = ['-'.join(x.split('-')[0:2]).upper() for x in split_list]
-
-        df = pd.DataFrame(data=sfc_probe, columns=['SFC_Probe'])
-        df['Paths'] = file_paths
-        df['String'] = split_list
-        df['datetime'] = df['String'].apply(self.get_datetime)
-
-        amb = []
-        hot = []
-
-        set_sfc_probe = []
-        [set_sfc_probe.append(x) for x in sfc_probe if x not in set_sfc_probe]
-
-        for x in range(len(set_sfc_probe)):
-            temp = df[df['SFC_Probe'] ==
-                      set_sfc_probe[x]].reset_index(drop=True)
-            # Sorts list and puts most recent at top
-            temp1 = temp.sort_values(
-                by='datetime', ascending=False, na_position='last')
-            latest = temp1.iloc[0, :]
-
-            if 'DIE TEST ELEVATED' in latest.loc['SFC_Probe'].upper():
-                try:
-                    hot.append(latest['Paths'])
-                except:
-                    print('No Elevated File Found for {}'.format(
-                        set_sfc_probe[x]))
-                    continue
-            elif 'DIE TEST BASELINE' in latest.loc['SFC_Probe'].upper():
-                try:
-                    amb.append(latest['Paths'])
-                except:
-                    print('No Baseline File Found for {}'.format(
-                        set_sfc_probe[x]))
-                    continue
-
-        list_amb = amb
-        list_hot = hot
+        if len(file_list) == 0:
+            return [], []
+
+        df = pd.DataFrame(data=[os.path.abspath(x) for x in file_list], columns=['Paths'])
+        df['String'] = [os.path.basename(x) for x in file_list]
+        fields = df['String'].str.split('-')
+        df['SFC_Probe'] = fields.str[0:2].str.join('-').str.upper()
+        # Same fields as get_datetime, files without a valid Date/Time are only used as a last resort
+        df['datetime'] = pd.to_datetime(fields.str[2].str.strip().str[:15],
+                                        format='%m%d%Y %H%M%S', errors='coerce').fillna(pd.Timestamp.min)
+
+        # Most recent file for each SFC_Probe, in order of first appearance
+        latest = df.loc[df.groupby('SFC_Probe', sort=False)['datetime'].idxmax()]
+
+        list_amb = latest.loc[latest['SFC_Probe'].str.contains(
+            'DIE TEST BASELINE', regex=False), 'Paths'].tolist()
+        list_hot = latest.loc[latest['SFC_Probe'].str.contains(
+            'DIE TEST ELEVATED', regex=False), 'Paths'].tolist()
 
         return list_amb, list_hot
 
@@ -226,92 +437,6 @@ class Parser():
 
         return ((count_in_amb == len(asic_list)) & (count_in_hot == len(asic_list))), amb, hot, asic_list_len, count_in_amb, count_in_hot
 
-    def check_temp_folder(self):
-        '''
-        Checks if Temporary Folder 'tmp_HotChuck' already exists at the User CDrive location.
-
-        Returns
-        -------
-        path : Path
-            Path to Temporary Folder
-
-        '''
-        parent = os.path.expanduser('~')
-        child = 'tmp_HotChuck'
-        path = os.path.join(parent, child)
-        if os.path.isdir(path):  # Does the directory exist
-            if len(os.listdir(path)) != 0:  # Does it contain files
-                self.delete_files(path)
-                os.makedirs(path)
-        else:
-            os.makedirs(path)
-        return path
-
-    def copy_files(self, file_list, to_path, AMB_or_HOT):
-        '''
-        Takes in file list from Collect_Files function and utilizes shutil library to copy files to Temporary Folder.
-
-        Parameters
-        ----------
-        file_list : List of Paths
-            File List of Elevated and Baseline XML files
-        to_path : Path
-            Temporary Folder r"C:/Users/User_Name/tmp_HotChuck"
-        AMB_or_HOT : String
-            'Baseline' or 'Elevated' for console printing.
-
-        Returns
-        -------
-        None.
-        '''
-        file_list_base = [os.path.basename(f) for f in file_list]
-        file_list_new = [os.path.join(to_path, f) for f in file_list_base]
-        for i in range(len(file_list)):
-            shutil.copyfile(file_list[i], file_list_new[i])
-            print('{}/{} {} has been stored temporarily.'.format(i,
-                  len(file_list), AMB_or_HOT))
-        return
-
-    def collect_copy_files(self, location):
-        '''
-        Collects all files from Temporary Folder and resorts into Baseline and Elevated Lists.
-
-        Parameters
-        ----------
-        location : Path
-            Path to Temporary Folder [C:/Users/User_Name/tmp_HotChuck]
-
-        Returns
-        -------
-        list_amb : List of Paths
-            File List of Baseline Test Results (XML)
-        list_hot : List of Paths
-            File List of Elevated Test Results (XML)
-
-        '''
-        path = location + '\\*.xml'
-        file_list = glob.glob(path)
-        list_amb, list_hot = self.sort_files(file_list)
-
-        return list_amb, list_hot
-
-    def delete_files(self, path):
-        '''
-        Deletes Temporary Folder and all internal files.
-
-        Parameters
-        ----------
-        path : Path
-            Path to Temporary Folder.
-
-        Returns
-        -------
-        None.
-
-        '''
-        shutil.rmtree(path)
-        return
-
     def get_datetime(self, file_name):
         '''
         Retrieves Date/Time object from File Name for each test result passed.
@@ -347,9 +472,10 @@ class Parser():
 
         return test_list
 
-    def create_data_dict(self, list_of_data_files, list_of_tests, AMB_or_HOT, tx_rx):
+    def create_data_dict(self, list_of_data_files, list_of_tests, AMB_or_HOT):
         '''
-        Creates Dictionary of {Test:DataFrame} for each Test.
+        Creates Dictionary of {Test:WaferData} for each Test.
+        Each file is read once for all tests in list_of_tests.
 
         Parameters
         ----------
@@ -362,86 +488,142 @@ class Parser():
 
         Returns
         -------
-        df_dict : Dictionary of {Test:DataFrame} Pairs
+        df_dict : Dictionary of {Test:WaferData} Pairs
 
         '''
 
-        df_dict = {}
+        df_dict = self.parse_xml_all(list_of_data_files, list_of_tests)
 
         for test in list_of_tests:
-            df = self.parse_xml_all(list_of_data_files, test, tx_rx)
-            df.reset_index(drop=True)
-            df_dict[test[0]+'___'+test[1]] = df
-
-            print('{} added to {} DataFrame.'.format(test, AMB_or_HOT))
+            print('{} added to {} Results.'.format(test, AMB_or_HOT))
         return df_dict
 
-    def parse_xml_all(self, file_list, test, tx_rx):
+    def parse_xml_all(self, file_list, list_of_tests):
         '''
-        Function to loop through test result file (XML) and gather needed data for the given test.
+        Function to loop through test result file (XML) and gather needed data for the given tests.
+        Files found in the result cache are not parsed again.
 
         Parameters
         ----------
         file_list : List of Paths
-        test : List of Test and Measurement
+        list_of_tests : List of [Test, Measurement]
 
         Returns
         -------
-        results : DataFrame
-            DataFrame with Prober Row_Column as index and numeric test data set to float.
+        df_dict : Dictionary of {Test:WaferData} Pairs
+            Element values for each ASIC with Setup/Summary metadata keyed by ProductSN.
 
         '''
-        i = 1
-        for f in file_list:
-            tree = ET.parse(f)
-            root = tree.getroot()
-
-            temp = {}
-
-            for child in root.findall('./Setup'):
-                temp['Timestamp'] = child.find('Timestamp').text
-                temp['ReportRevision'] = child.find('ReportRevision').text
-                temp['Operator'] = child.find('Operator').text
-                temp['Equipment'] = child.find('Equipment').text
-                temp['PlatformTestSW'] = child.find('PlatformTestSW').text
-                temp['ProductTestSW'] = child.find('ProductTestSW').text
-                temp['Product'] = child.find('Product').text
-                temp['ProcessStep'] = child.find('ProcessStep').text
-                temp['LotNumber'] = child.find('LotNumber').text
-                temp['ProductSN'] = child.find('ProductSN').text
-
-            for child in root.findall('./Summary'):
-                temp['OverallResult'] = child.find('OverallResult').text
-
-            for child in root.findall('./Detail/Entry[Name="'+test[0]+'"]/Group[Measurement="'+test[1]+'"]/..'):
-                temp['TestResult'] = child.find('Result').text
-
-            for child in root.findall('./Detail/Entry[Name="'+test[0]+'"]/Group[Measurement="'+test[1]+'"]/Record/Value'):
-                temp[child.attrib['Record']] = child.text
-
-            # Constructing DataFrame
-            if i == 1:
-                temp1 = pd.DataFrame.from_dict(temp, orient='index', columns=[
-                                               root.find('./Setup/ProductSN').text])
-                result = temp1
-            elif i == 2:
-                temp2 = pd.DataFrame.from_dict(temp, orient='index', columns=[
-                                               root.find('./Setup/ProductSN').text])
-                result = pd.concat([temp1, temp2], axis=1)
-            else:
-                temp2 = pd.DataFrame.from_dict(temp, orient='index', columns=[
-                                               root.find('./Setup/ProductSN').text])
-                result = pd.concat([result, temp2], axis=1)
+        return self.fill_data(self.extract_results(file_list, list_of_tests), list_of_tests)
+
+    def extract_results(self, file_list, list_of_tests):
+        '''
+        Returns extract_arrays result of each file, from the result cache when possible.
+        Files can be passed one at a time (i.e. as they arrive, see watch.WaferWatcher).
 
-            # print('{}/{} has been parsed.'.format(i,len(file_list)))
+        Parameters
+        ----------
+        file_list : List of Paths
+        list_of_tests : List of [Test, Measurement]
 
-            i += 1
+        Returns
+        -------
+        results : List of (info, data)
+            In file_list order.
 
-        results = result.T
-        results.iloc[:, results.columns.get_loc(
-            f'{tx_rx} Element[0]'):] = results.iloc[:, results.columns.get_loc(f'{tx_rx} Element[0]'):].astype('float')
+        '''
+        results = [None] * len(file_list)
+        keys = [None] * len(file_list)
+        if self.result_cache is not None:
+            with instrument.span('result_cache_get', files=len(file_list)) as s:
+                for i, f in enumerate(file_list):
+                    keys[i] = self.result_cache.key(
+                        f, list_of_tests, self.dtype, self.layout.asic_shape)
+                    results[i] = self.result_cache.get(keys[i])
+                s.add(hits=sum(x is not None for x in results))
+        missing = [i for i in range(len(file_list)) if results[i] is None]
+        if len(missing) < len(file_list):
+            print(f'{len(file_list) - len(missing)}/{len(file_list)} files loaded from result cache.')
+
+        # Files are read directly from the input directory unless a local mirror is used
+        sources = [file_list[i] for i in missing]
+        if self.mirror_cache is not None and not self.prefetching(sources):
+            # Prefetched files are copied to the mirror as they are read
+            with instrument.span('copy', files=len(sources)):
+                sources = self.mirror_cache.get_files(sources)
+
+        for i, result in zip(missing, self.extract_files(sources, list_of_tests)):
+            results[i] = result
+            if self.result_cache is not None:
+                with instrument.span('result_cache_put', files=1):
+                    self.result_cache.put(keys[i], *result)
         return results
 
+    def fill_data(self, results, list_of_tests):
+        '''
+        Creates Dictionary of {Test:WaferData} from extract_results results (one ASIC per result).
+
+        Returns
+        -------
+        df_dict : Dictionary of {Test:WaferData} Pairs
+
+        '''
+        df_dict = {test_key(test): WaferData.allocate(test_key(test), len(results), self.dtype,
+                                                      self.layout.asic_shape)
+                   for test in list_of_tests}
+        rows = {test_key(test): [] for test in list_of_tests}
+
+        with instrument.span('fill', asics=len(results)):
+            for i, (info, data) in enumerate(results):
+                for key, (result, elements) in data.items():
+                    df_dict[key].elements[i] = elements
+                    rows[key].append(dict(info, TestResult=result))
+
+            for key in df_dict:
+                df_dict[key].set_meta(rows[key])
+        return df_dict
+
+    def prefetching(self, file_list):
+        '''
+        Returns True if files are read ahead by extract_files (serial parse with prefetch threads).
+        '''
+        return self.prefetch > 0 and not (self.workers > 1 and len(file_list) > 1)
+
+    def extract_files(self, file_list, list_of_tests):
+        '''
+        Runs extract_arrays for each file. Files are spread across a process pool when
+        Parser was created with workers > 1. Otherwise, with prefetch > 0, files are read ahead in
+        threads (through the mirror cache when used) and parsed from memory while later files
+        are still being read.
+
+        Parameters
+        ----------
+        file_list : List of Paths
+        list_of_tests : List of [Test, Measurement]
+
+        Returns
+        -------
+        results : List of (info, data)
+            In file_list order.
+
+        '''
+        args = (repeat(list_of_tests), repeat(self.dtype), repeat(self.layout.asic_shape))
+        if self.workers > 1 and len(file_list) > 1:
+            chunksize = max(1, len(file_list) // (self.workers * 4))
+            # Per file spans are recorded by the workers (when forked after instrument.start)
+            with instrument.span('parse_files', {'workers': self.workers},
+                                 files=len(file_list)):
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    # map returns results in file_list order
+                    return list(pool.map(extract_arrays, file_list, *args, chunksize=chunksize))
+        if self.prefetching(file_list):
+            read = self.mirror_cache.get_bytes if self.mirror_cache is not None else None
+            reader = PrefetchReader(file_list, self.prefetch, self.prefetch_bytes, read)
+            with instrument.span('parse_files', {'prefetch': self.prefetch},
+                                 files=len(file_list)):
+                return list(map(extract_arrays, (io.BytesIO(data) for _, data in reader), *args))
+        return list(map(extract_arrays, file_list, *args))
+
     def keys_match(self, df_amb, df_hot):
         '''
         Function to make sure Keys match between Data Dictionaries.
@@ -1,244 +1,428 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import matplotlib.pyplot as plt
 from matplotlib import colors
 from matplotlib import gridspec
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import Rectangle
 import seaborn as sns
 import numpy as np
 
-
-class Plotter_Tx():
-    def __init__(self, df_amb, df_hot, location, asic_list, sfc):
-        self.df_amb = df_amb
-        self.df_hot = df_hot
+import instrument
+from wafer_data import WaferData, ratio
+from wafer_layout import get_layout
+
+# Pixel gap between ASIC tiles in raster images
+TILE_GAP = 4
+
+# Colormap shared by all HeatMaps
+HEATMAP_CMAP = colors.LinearSegmentedColormap.from_list("mycmap", ['#000000', '#B9B9B9', '#FFFFFF'])\
+    .with_extremes(over='red', under='blue')
+# .with_extremes(over='#ff0000', under='#91fbfe')
+# Diverging colormap for Elevated / Baseline ratio panels
+RATIO_CMAP = plt.get_cmap('coolwarm').with_extremes(over='#ff00ff', under='#00ffff')
+
+# One panel (subfigure) of a HeatMap figure.
+# channel : 'Tx' or 'Rx'
+# stage : 'Baseline', 'Elevated' or None for a panel without data (sites are labelled only)
+# vmin, vmax : color limits
+# normalize : divide each ASIC by its mean
+# cmap : colormap, colorbar : draw a colorbar below the panel
+PanelSpec = namedtuple('PanelSpec', ['title', 'channel', 'stage', 'vmin', 'vmax', 'normalize', 'cmap',
+                                     'colorbar'], defaults=(HEATMAP_CMAP, False))
+
+TX_PANELS = [PanelSpec('Baseline', 'Tx', 'Baseline', 0.75, 1.25, True),
+             PanelSpec('Elevated', 'Tx', 'Elevated', 0.75, 1.25, True)]
+RX_PANELS = [PanelSpec('Baseline No Longer Performs Rx Tests', 'Rx', None, 0.5, 1.5, True),
+             PanelSpec('Elevated', 'Rx', 'Elevated', 0.5, 1.5, True)]
+# Per element drift (stage 'Ratio' is Elevated / Baseline, see wafer_data.ratio)
+TX_RATIO_PANEL = PanelSpec('Elevated / Baseline', 'Tx', 'Ratio', 0.9, 1.1, False,
+                           RATIO_CMAP, True)
+
+
+def channel_limits(channel):
+    '''
+    Returns (Lower, Upper) limits of element value divided by ASIC mean for 'Tx' or 'Rx',
+    the color limits of the channel's Elevated HeatMap panel. Used for out of limits counts.
+    '''
+    panels = TX_PANELS if channel == 'Tx' else RX_PANELS
+    panel = [x for x in panels if x.stage == 'Elevated'][0]
+    return panel.vmin, panel.vmax
+
+
+def wafer_tiles(data, normalize=True):
+    '''
+    Returns lookup of ASIC tiles for a wafer.
+
+    Parameters
+    ----------
+    data : WaferData
+    normalize : Boolean
+        Divide each ASIC by its mean
+
+    Returns
+    -------
+    tiles : Dictionary of {ASIC:Array}
+        (ASIC Columns, ASIC Rows) views rotated for plotting.
+        Normalized tiles come from WaferData.normalized(), which is computed once per wafer.
+
+    '''
+    elements = data.normalized() if normalize else data.elements
+    rotated = np.rot90(elements, axes=(1, 2))
+    return {asic: rotated[i] for asic, i in data.asic_index.items()}
+
+
+def compose_wafer(tiles, grid_rows, grid_cols, vmin, vmax, cmap, layout, gap=TILE_GAP):
+    '''
+    Composes ASIC tiles into one wafer sized RGBA image.
+    The colormap (including over/under colors) is applied to all tiles at once and tiles are
+    placed on the grid with one indexed assignment.
+
+    Parameters
+    ----------
+    tiles : Array
+        (n, Tile Height, Tile Width) stack of rotated tiles
+    grid_rows, grid_cols : Arrays
+        Zero based grid position of each tile. i.e. from WaferLayout.grid_cells
+    vmin, vmax : Float
+        Color limits
+    cmap : Colormap
+    layout : WaferLayout
+
+    Returns
+    -------
+    image : Array
+        (Rows*Tile Height + gaps, Columns*Tile Width + gaps, 4) uint8 RGBA image with white
+        background (the 8 bit colors Agg draws anyway, an eighth of the memory of float RGBA)
+
+    '''
+    tile_h, tile_w = layout.asic_shape[::-1]
+    # One (Tile + gap) cell per site, gap after the last row and column is cropped
+    cells = np.full((layout.rows, layout.cols, tile_h + gap, tile_w + gap, 4), 255, dtype=np.uint8)
+    if len(tiles) > 0:
+        cells[grid_rows, grid_cols, :tile_h, :tile_w] = cmap(
+            colors.Normalize(vmin=vmin, vmax=vmax)(tiles), bytes=True)
+    image = cells.transpose(0, 2, 1, 3, 4).reshape(
+        layout.rows * (tile_h + gap), layout.cols * (tile_w + gap), 4)
+    return image[:image.shape[0] - gap, :image.shape[1] - gap]
+
+
+class Plotter():
+    '''
+    Wafer HeatMap figure built from a list of PanelSpec (one subfigure per panel).
+
+    Parameters
+    ----------
+    data : Dictionary of {(Channel, Stage):WaferData}
+    panels : List of PanelSpec
+    location : Path
+        Directory to store HeatMap output
+    asic_list : List
+        List of ASIC from configuration file
+    sfc : String
+        SFC of Wafer
+    raster : Boolean
+        Draw each panel as a single image instead of seaborn subplots (faster)
+    layout : WaferLayout
+        Wafer geometry (default 9 x 13 wafer of 40 x 75 ASICs)
+    title : String
+        End of figure title (after SFC and test)
+
+    '''
+
+    def __init__(self, data, panels, location, asic_list, sfc, raster=False, layout=None,
+                 title='Baseline vs Elevated Wafer HeatMaps'):
+        self.data = data
+        self.panels = panels
         self.location = location
         self.asic_list = asic_list
         self.sfc = sfc
-
-    def row_conv(self, row):
-        old = list(range(1, 10, 1))
-        new = list(range(9, 0, -1))
-        row_dict = dict(zip(old, new))
-        new_row = row_dict[row]
-        return new_row
+        self.raster = raster
+        self.title = title
+        self.layout = layout if layout is not None else get_layout(tuple(asic_list))
+
+    def panel_tiles(self, panel):
+        '''
+        Returns {ASIC:Array} tiles of panel, None for a panel without data.
+        '''
+        data = self.data.get((panel.channel, panel.stage))
+        if data is None:
+            return None
+        return wafer_tiles(data, panel.normalize)
+
+    def test_key(self):
+        '''
+        Returns test key of the first panel with data. i.e. 'Tx Element Peak-Peak___Pk-Pk'
+        '''
+        return next(self.data[(x.channel, x.stage)].test for x in self.panels
+                    if (x.channel, x.stage) in self.data)
 
     def plot_wafers(self):
+        key = self.test_key()
+        tiles = [self.panel_tiles(x) for x in self.panels]
 
-        amb_keys = list(self.df_amb.keys())
-        hot_keys = list(self.df_hot.keys())
-        amb_key = amb_keys[-1]
-        hot_key = hot_keys[-1]
-        print(f'Baseline Key: {amb_key}')
-        print(f'Elevated Key: {hot_key}')
-
-        size = tuple(np.array((24, 15))*0.75)  # for rotated
+        # Two panels are 24 x 15, wider for more panels
+        size = tuple(np.array((24 * max(len(self.panels), 2) / 2, 15))*0.75)  # for rotated
         fig = plt.figure(figsize=size, dpi=300, constrained_layout=True)
-        title = f'{self.sfc} - {amb_key} - Baseline vs Elevated Wafer HeatMaps'
+        title = f'{self.sfc} - {key} - {self.title}'
         fig.suptitle(title, fontsize='xx-large')
-        subfigs = fig.subfigures(
-            ncols=2, nrows=1, edgecolor='black', linewidth=1.0, frameon=True)
-        subfig1 = subfigs[0]
-        subfig2 = subfigs[1]
-        subfig1.suptitle('Baseline', fontsize='x-large')
-        subfig2.suptitle('Elevated', fontsize='x-large')
-
-        spec1 = gridspec.GridSpec(ncols=13, nrows=9,
-                                  wspace=0.025, hspace=0.025,
-                                  figure=subfig1)
-        spec2 = gridspec.GridSpec(ncols=13, nrows=9,
-                                  wspace=0.025, hspace=0.025,
-                                  figure=subfig2)
-
-        for row in range(1, 10):
-            for col in range(1, 14):
-                if f'{row:03.0f}_{col:03.0f}' in self.asic_list:
-
-                    ax1 = subfig1.add_subplot(
-                        spec1[self.row_conv(row)-1, col-1])
-                    ax2 = subfig2.add_subplot(
-                        spec2[self.row_conv(row)-1, col-1])
-
-                    amb_temp = self.df_amb[amb_key]
-                    amb_temp.set_index(
-                        amb_temp.loc[:, 'ProductSN'].str.slice(-7), inplace=True)
-                    amb_temp.sort_index(inplace=True)
-
-                    hot_temp = self.df_hot[hot_key]
-                    hot_temp.set_index(
-                        hot_temp.loc[:, 'ProductSN'].str.slice(-7), inplace=True)
-                    hot_temp.sort_index(inplace=True)
-
-                    asic = f'{row:03.0f}_{col:03.0f}'
-                    amb_array = amb_temp.iloc[amb_temp.index.get_loc(
-                        asic), amb_temp.columns.get_loc('Tx Element[0]'):].to_numpy()
-                    hot_array = hot_temp.iloc[hot_temp.index.get_loc(
-                        asic), hot_temp.columns.get_loc('Tx Element[0]'):].to_numpy()
-
-                    # Creation of Matrix representing R=40, C=75 ASIC
-
-                    amb_elements = np.reshape(amb_array, [40, 75])
-                    hot_elements = np.reshape(hot_array, [40, 75])
-
-                    avg_amb = amb_elements.mean()
-                    norm_amb_elements = amb_elements/avg_amb
-                    norm_amb_elements = np.rot90(norm_amb_elements)
-
-                    avg_hot = hot_elements.mean()
-                    norm_hot_elements = hot_elements/avg_hot
-                    norm_hot_elements = np.rot90(norm_hot_elements)
-
-                    newcmp = colors.LinearSegmentedColormap.from_list("mycmap", ['#000000', '#B9B9B9', '#FFFFFF'])\
-                        .with_extremes(over='red', under='blue')
-                    # .with_extremes(over='#ff0000', under='#91fbfe')
-
-                    sns.heatmap(norm_amb_elements.astype(np.float64),
-                                ax=ax1,
-                                square=True,
-                                cmap=newcmp,
-                                vmin=0.75,
-                                vmax=1.25,
-                                cbar=False)
-
-                    sns.heatmap(norm_hot_elements.astype(np.float64),
-                                ax=ax2,
-                                square=True,
-                                cmap=newcmp,
-                                vmin=0.75,
-                                vmax=1.25,
-                                cbar=False)
-
-                    ax1.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    ax2.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    print(f'{row}:{col} added')
-                else:
-                    ax1 = subfig1.add_subplot(
-                        spec1[self.row_conv(row)-1, col-1], frame_on=False)
-                    ax1.annotate(f'{row}:{col}', xy=(0.5, 0.5), xycoords='axes fraction',
-                                 va='center', ha='center')
-
-                    ax2 = subfig2.add_subplot(
-                        spec2[self.row_conv(row)-1, col-1], frame_on=False)
-                    ax2.annotate(f'{row}:{col}', xy=(0.5, 0.5), xycoords='axes fraction',
-                                 va='center', ha='center')
-
-                    ax1.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    ax2.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
+        subfigs = np.atleast_1d(fig.subfigures(
+            ncols=len(self.panels), nrows=1, edgecolor='black', linewidth=1.0, frameon=True))
+
+        for subfig, panel in zip(subfigs, self.panels):
+            subfig.suptitle(panel.title, fontsize='x-large')
+        if self.raster:
+            for subfig, panel, panel_tiles in zip(subfigs, self.panels, tiles):
+                with instrument.span('render_panel', {'sfc': self.sfc, 'panel': panel.title},
+                                     asics=len(panel_tiles or ())):
+                    self.draw_raster(subfig, panel, panel_tiles)
+        else:
+            # Grid panels are drawn together (see draw_grid)
+            with instrument.span('render_panel', {'sfc': self.sfc, 'panel': 'all'},
+                                 asics=sum(len(x or ()) for x in tiles)):
+                self.draw_grid(subfigs, tiles)
+        for subfig, panel in zip(subfigs, self.panels):
+            if panel.colorbar:
+                self.draw_colorbar(subfig, panel)
 
         plot_path = self.location
-        fig.savefig(plot_path+r'\\'+f'{self.sfc} - {amb_key}',
-                    dpi=300,
-                    bbox_inches='tight')
+        extra_artists = None
+        if self.raster:
+            # Panel frames are kept inside the tight bounding box
+            extra_artists = fig.get_default_bbox_extra_artists() + \
+                [x.patch for x in subfigs]
+        with instrument.span('savefig', {'sfc': self.sfc, 'test': key}):
+            fig.savefig(os.path.join(plot_path, f'{self.sfc} - {key}'),
+                        dpi=300,
+                        bbox_inches='tight',
+                        bbox_extra_artists=extra_artists)
         plt.close(fig)
 
-
-class Plotter_Rx():
-    def __init__(self, df_hot, location, asic_list, sfc):
-        self.df_hot = df_hot
-        self.location = location
-        self.asic_list = asic_list
-        self.sfc = sfc
-
-    def row_conv(self, row):
-        old = list(range(1, 10, 1))
-        new = list(range(9, 0, -1))
-        row_dict = dict(zip(old, new))
-        new_row = row_dict[row]
-        return new_row
-
-    def plot_wafers(self):
-
-        hot_keys = list(self.df_hot.keys())
-        hot_key = hot_keys[-1]
-        print(f'Elevated Key: {hot_key}')
-
-        size = tuple(np.array((24, 15))*0.75)  # for rotated
-        fig = plt.figure(figsize=size, dpi=300, constrained_layout=True)
-        title = f'{self.sfc} - {hot_key} - Baseline vs Elevated Wafer HeatMaps'
-        fig.suptitle(title, fontsize='xx-large')
-        subfigs = fig.subfigures(
-            ncols=2, nrows=1, edgecolor='black', linewidth=1.0, frameon=True)
-        subfig1 = subfigs[0]
-        subfig2 = subfigs[1]
-        subfig1.suptitle(
-            'Baseline No Longer Performs Rx Tests', fontsize='x-large')
-        subfig2.suptitle('Elevated', fontsize='x-large')
-
-        spec1 = gridspec.GridSpec(ncols=13, nrows=9,
-                                  wspace=0.025, hspace=0.025,
-                                  figure=subfig1)
-        spec2 = gridspec.GridSpec(ncols=13, nrows=9,
-                                  wspace=0.025, hspace=0.025,
-                                  figure=subfig2)
-
-        for row in range(1, 10):
-            for col in range(1, 14):
-                if f'{row:03.0f}_{col:03.0f}' in self.asic_list:
-
-                    ax2 = subfig2.add_subplot(
-                        spec2[self.row_conv(row)-1, col-1])
-
-                    hot_temp = self.df_hot[hot_key]
-                    hot_temp.set_index(
-                        hot_temp.loc[:, 'ProductSN'].str.slice(-7), inplace=True)
-                    hot_temp.sort_index(inplace=True)
-
-                    asic = f'{row:03.0f}_{col:03.0f}'
-                    hot_array = hot_temp.iloc[hot_temp.index.get_loc(
-                        asic), hot_temp.columns.get_loc('Rx Element[0]'):].to_numpy()
-
-                    # Creation of Matrix representing R=40, C=75 ASIC
-
-                    hot_elements = np.reshape(hot_array, [40, 75])
-
-                    avg_hot = hot_elements.mean()
-                    norm_hot_elements = hot_elements/avg_hot
-                    norm_hot_elements = np.rot90(norm_hot_elements)
-
-                    newcmp = colors.LinearSegmentedColormap.from_list("mycmap", ['#000000', '#B9B9B9', '#FFFFFF'])\
-                        .with_extremes(over='red', under='blue')
-                    # .with_extremes(over='#ff0000', under='#91fbfe')
-
-                    sns.heatmap(norm_hot_elements.astype(np.float64),
-                                ax=ax2,
+    def draw_grid(self, subfigs, tiles):
+        '''
+        Draws panels as grids of seaborn heatmaps (one subplot per site).
+        Sites are added to all panels together: every seaborn heatmap draws the whole figure,
+        so adding one panel after another makes the later heatmaps slower to draw.
+        '''
+        specs = [gridspec.GridSpec(ncols=self.layout.cols, nrows=self.layout.rows,
+                                   wspace=0.025, hspace=0.025,
+                                   figure=x) for x in subfigs]
+
+        for site in self.layout.sites:
+            for subfig, spec, panel, panel_tiles in zip(subfigs, specs, self.panels, tiles):
+                if panel_tiles is not None and site.asic in panel_tiles:
+                    ax = subfig.add_subplot(spec[site.grid_row, site.grid_col])
+                    # float32 tiles are drawn as they are (no float64 copy)
+                    sns.heatmap(panel_tiles[site.asic],
+                                ax=ax,
                                 square=True,
-                                cmap=newcmp,
-                                vmin=0.5,
-                                vmax=1.5,
+                                cmap=panel.cmap,
+                                vmin=panel.vmin,
+                                vmax=panel.vmax,
                                 cbar=False)
-
-                    ax1 = subfig1.add_subplot(
-                        spec1[self.row_conv(row)-1, col-1], frame_on=True)
-                    ax1.annotate(f'{row}:{col}', xy=(0.5, 0.5), xycoords='axes fraction',
-                                 va='center', ha='center')
-
-                    ax1.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    ax2.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    print(f'{row}:{col} added')
+                    print(f'{site.label} added')
                 else:
-                    ax1 = subfig1.add_subplot(
-                        spec1[self.row_conv(row)-1, col-1], frame_on=False)
-                    ax1.annotate(f'{row}:{col}', xy=(0.5, 0.5), xycoords='axes fraction',
-                                 va='center', ha='center')
-
-                    ax2 = subfig2.add_subplot(
-                        spec2[self.row_conv(row)-1, col-1], frame_on=False)
-                    ax2.annotate(f'{row}:{col}', xy=(0.5, 0.5), xycoords='axes fraction',
-                                 va='center', ha='center')
-
-                    ax1.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-                    ax2.tick_params(left=False, right=False, labelleft=False,
-                                    labelbottom=False, bottom=False)
-
-        plot_path = self.location
-        fig.savefig(plot_path+r'\\'+f'{self.sfc} - {hot_key}',
-                    dpi=300,
-                    bbox_inches='tight')
-        plt.close(fig)
+                    ax = subfig.add_subplot(
+                        spec[site.grid_row, site.grid_col], frame_on=site.used)
+                    ax.annotate(site.label, xy=(0.5, 0.5), xycoords='axes fraction',
+                                va='center', ha='center')
+
+                ax.tick_params(left=False, right=False, labelleft=False,
+                               labelbottom=False, bottom=False)
+
+    def draw_colorbar(self, subfig, panel):
+        '''
+        Draws horizontal color scale of panel below its sites.
+        '''
+        mappable = plt.cm.ScalarMappable(colors.Normalize(vmin=panel.vmin, vmax=panel.vmax),
+                                         panel.cmap)
+        subfig.colorbar(mappable, ax=subfig.axes, location='bottom', extend='both',
+                        shrink=0.6, aspect=40)
+
+    def draw_raster(self, subfig, panel, tiles):
+        '''
+        Fast alternative to draw_grid: panel is a single imshow of a composed wafer image with
+        Row:Column labels drawn on sites without data.
+        '''
+        tile_h, tile_w = self.layout.asic_shape[::-1]
+        ax = subfig.add_subplot()
+
+        asics = [x for x in self.layout.asic_list if tiles is not None and x in tiles]
+        grid_rows, grid_cols = self.layout.grid_cells(asics)
+        stack = np.stack([tiles[x] for x in asics]) if asics else np.empty((0, tile_h, tile_w))
+
+        plotted = set(asics)
+        labels = []
+        frames = []
+        for site in self.layout.sites:
+            if site.asic in plotted:
+                continue
+            r, c = site.grid_row, site.grid_col
+            labels.append((r, c, site.label))
+            if site.used:
+                frames.append(Rectangle((c * (tile_w + TILE_GAP) - 0.5, r * (tile_h + TILE_GAP) - 0.5),
+                                        tile_w, tile_h))
+
+        ax.imshow(compose_wafer(stack, grid_rows, grid_cols, panel.vmin, panel.vmax, panel.cmap,
+                                self.layout),
+                  interpolation='nearest')
+        ax.add_collection(PatchCollection(frames, facecolor='none',
+                                          edgecolor='black', linewidth=0.5))
+        for r, c, label in labels:
+            ax.text(c * (tile_w + TILE_GAP) + tile_w / 2, r * (tile_h + TILE_GAP) + tile_h / 2, label,
+                    va='center', ha='center')
+        ax.set_axis_off()
+
+
+class Plotter_Tx(Plotter):
+    '''
+    Baseline vs Elevated Tx HeatMaps. With delta=True a third panel shows the Elevated / Baseline
+    ratio of every element, aligned by ASIC, on its own color scale.
+    '''
+
+    def __init__(self, df_amb, df_hot, location, asic_list, sfc, raster=False, layout=None,
+                 delta=False):
+        amb_key = list(df_amb.keys())[-1]
+        hot_key = list(df_hot.keys())[-1]
+        print(f'Baseline Key: {amb_key}')
+        print(f'Elevated Key: {hot_key}')
+        data = {('Tx', 'Baseline'): df_amb[amb_key], ('Tx', 'Elevated'): df_hot[hot_key]}
+        panels = TX_PANELS
+        if delta:
+            data[('Tx', 'Ratio')], alignment = ratio(df_amb[amb_key], df_hot[hot_key])
+            for message in alignment.report():
+                print(message)
+            panels = TX_PANELS + [TX_RATIO_PANEL]
+        super().__init__(data, panels, location, asic_list, sfc, raster, layout)
+
+
+class Plotter_Rx(Plotter):
+    '''
+    Elevated Rx HeatMap. delta is accepted for the same options as Plotter_Tx and ignored,
+    since Baseline no longer performs Rx tests.
+    '''
+
+    def __init__(self, df_hot, location, asic_list, sfc, raster=False, layout=None, delta=False):
+        hot_key = list(df_hot.keys())[-1]
+        print(f'Elevated Key: {hot_key}')
+        super().__init__({('Rx', 'Elevated'): df_hot[hot_key]},
+                         RX_PANELS, location, asic_list, sfc, raster, layout)
+
+
+# One figure to render: channel is 'Tx' or 'Rx', baseline/elevated are {Test:WaferData}
+# (baseline is None for Rx), options are additional Plotter keyword arguments
+RenderJob = namedtuple('RenderJob', ['sfc', 'channel', 'baseline', 'elevated', 'asic_list', 'location',
+                                     'options'])
+
+
+def render(job):
+    '''
+    Renders one RenderJob with Plotter_Tx or Plotter_Rx.
+    '''
+    options = job.options or {}
+    if job.channel == 'Tx':
+        Plotter_Tx(job.baseline, job.elevated, job.location,
+                   job.asic_list, job.sfc, **options).plot_wafers()
+    else:
+        Plotter_Rx(job.elevated, job.location,
+                   job.asic_list, job.sfc, **options).plot_wafers()
+    return job.sfc, job.channel
+
+
+def share_data(df_dict, blocks, shared):
+    '''
+    Copies element arrays of {Test:WaferData} into shared memory.
+    Returns {Test:(test, meta, (name, shape, dtype))} descriptors that can be sent to workers cheaply.
+    Each WaferData is only copied once (tracked in shared by id).
+    '''
+    if df_dict is None:
+        return None
+    result = {}
+    for key, data in df_dict.items():
+        if id(data) not in shared:
+            shm = shared_memory.SharedMemory(
+                create=True, size=max(1, data.elements.nbytes))
+            blocks.append(shm)
+            np.ndarray(data.elements.shape, data.elements.dtype,
+                       buffer=shm.buf)[...] = data.elements
+            shared[id(data)] = (data.test, data.meta,
+                                (shm.name, data.elements.shape, data.elements.dtype.str))
+        result[key] = shared[id(data)]
+    return result
+
+
+def attach_data(descriptors, blocks):
+    '''
+    Rebuilds {Test:WaferData} from share_data descriptors using views into shared memory.
+    '''
+    if descriptors is None:
+        return None
+    result = {}
+    for key, (test, meta, (name, shape, dtype)) in descriptors.items():
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        result[key] = WaferData(test, meta, np.ndarray(
+            shape, np.dtype(dtype), buffer=shm.buf))
+    return result
+
+
+def init_render_worker():
+    # Worker processes never open windows
+    plt.switch_backend('Agg')
+
+
+def render_shared(job):
+    '''
+    Worker side of render_jobs: attaches shared element arrays and renders job.
+    '''
+    blocks = []
+    try:
+        job = job._replace(baseline=attach_data(job.baseline, blocks),
+                           elevated=attach_data(job.elevated, blocks))
+        return render(job)
+    finally:
+        # Drop array views before closing shared memory
+        del job
+        for shm in blocks:
+            shm.close()
+
+
+def render_jobs(jobs, workers=1):
+    '''
+    Renders figures in a process pool using the Agg backend.
+    Element arrays are placed in shared memory once and workers receive only small descriptors.
+
+    Parameters
+    ----------
+    jobs : List of RenderJob
+    workers : Integer
+        Number of processes (1 = render in this process)
+
+    Returns
+    -------
+    done : List of (SFC, Channel)
+        In jobs order.
+
+    '''
+    if workers <= 1 or len(jobs) <= 1:
+        return [render(job) for job in jobs]
+
+    blocks = []
+    shared = {}
+    try:
+        shared_jobs = [job._replace(baseline=share_data(job.baseline, blocks, shared),
+                                    elevated=share_data(job.elevated, blocks, shared))
+                       for job in jobs]
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                 initializer=init_render_worker) as pool:
+            return list(pool.map(render_shared, shared_jobs))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
 
 
 if __name__ == '__main__':
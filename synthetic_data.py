@@ -0,0 +1,225 @@
+'''
+Synthetic Die Test XML generator for local testing and benchmarks (real data can't leave the fab).
+
+Example:
+    python synthetic_data.py C:/PATH/TO/SYNTHETIC --wafers 5 --asics 77 --retest 0.2 --aborted 0.1
+
+Files follow the naming convention decoded by file_catalog.parse_file_name and
+Parser.sort_files / get_datetime:
+
+    {SFC} {Row_Column}-Die Test {Baseline|Elevated}-{MMDDYYYY HHMMSS}[ ABORTED].xml
+
+and contain the Setup, Summary and Detail/Entry/Group/Record/Value layout read by
+parse_data.extract_xml. A matching configuration file is written next to the data.
+'''
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from wafer_layout import WaferLayout
+
+# 77 ASICs of the standard 9 x 13 wafer (same as configuration_app_github.json)
+DEFAULT_ASIC_LIST = ['001_006', '001_007', '001_008'] + \
+    [f'002_{x:03d}' for x in range(4, 11)] + \
+    [f'{r:03d}_{c:03d}' for r in (3, 4) for c in range(2, 13)] + \
+    [f'005_{x:03d}' for x in range(1, 14)] + \
+    [f'{r:03d}_{c:03d}' for r in (6, 7) for c in range(2, 13)] + \
+    [f'008_{x:03d}' for x in range(4, 11)] + \
+    ['009_006', '009_007', '009_008']
+
+STAGE_TESTS = {'Baseline': ['Tx Element Peak-Peak'],
+               'Elevated': ['Tx Element Peak-Peak', 'Rx Element Peak-Peak']}
+
+
+class SyntheticData():
+    '''
+    Writes synthetic Baseline and Elevated test result files for a number of wafers.
+
+    Parameters
+    ----------
+    location : Path
+        Root directory of generated data
+    wafers : Integer
+        Number of wafers (SFCs)
+    asic_list : List
+        ASICs tested on each wafer (default: 77 ASICs of the standard wafer)
+    retest : Float
+        Probability that a test is repeated (older file kept next to the newest one)
+    aborted : Float
+        Probability that an extra ABORTED file is written for a test
+    depth : Integer
+        Folder levels between location and the files (1 = one folder per SFC)
+    other_entries : Integer
+        Detail Entries of other tests written before the requested tests (skipped by the parser)
+    layout : WaferLayout
+        Wafer geometry (elements per ASIC)
+    seed : Integer
+        Values and noise are the same for the same seed
+
+    '''
+
+    def __init__(self, location, wafers=1, asic_list=None, retest=0.0, aborted=0.0, depth=1,
+                 other_entries=5, layout=None, seed=0):
+        self.location = os.path.abspath(location)
+        self.wafers = wafers
+        self.asic_list = list(asic_list) if asic_list is not None else DEFAULT_ASIC_LIST
+        self.layout = layout if layout is not None else WaferLayout(self.asic_list)
+        self.retest = retest
+        self.aborted = aborted
+        self.depth = max(1, depth)
+        self.other_entries = other_entries
+        self.seed = seed
+        self.start = datetime(2022, 5, 12, 8, 0, 0)
+
+    def sfc(self, wafer):
+        return f'SY{wafer:04d}'
+
+    def folder(self, wafer):
+        '''
+        Returns folder of wafer files, depth - 1 shared levels above one folder per SFC.
+        '''
+        levels = [f'Level{level}_{wafer // (4 ** (self.depth - 1 - level))}'
+                  for level in range(self.depth - 1)]
+        return os.path.join(self.location, *levels, self.sfc(wafer))
+
+    def values(self, rng, gain):
+        '''
+        Returns element values of one test: ASIC gain, a gradient across the ASIC and noise.
+        '''
+        rows, cols = self.layout.asic_shape
+        gradient = np.linspace(-0.05, 0.05, cols)[None, :] + np.linspace(-0.02, 0.02, rows)[:, None]
+        return (gain * (1 + gradient + rng.normal(0, 0.08, (rows, cols)))).ravel()
+
+    def write_file(self, path, sfc, asic, stage, timestamp, values, aborted=False):
+        '''
+        Writes one test result file.
+
+        Parameters
+        ----------
+        values : Dictionary of {Test:Array}
+            Element values of each test (empty for an aborted test)
+
+        '''
+        setup = {'Timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'ReportRevision': '1.0',
+                 'Operator': 'synthetic',
+                 'Equipment': 'HotChuck-SIM',
+                 'PlatformTestSW': '0.0.0',
+                 'ProductTestSW': '0.0.0',
+                 'Product': 'SYNTHETIC',
+                 'ProcessStep': f'Die Test {stage}',
+                 'LotNumber': sfc[:4],
+                 'ProductSN': f'{sfc}01 {asic}'}
+        parts = ['<?xml version="1.0" encoding="utf-8"?>\n<Report>\n<Setup>']
+        parts.extend(f'<{k}>{v}</{k}>' for k, v in setup.items())
+        parts.append('</Setup>\n<Summary><OverallResult>'
+                     f'{"Aborted" if aborted else "Pass"}</OverallResult></Summary>\n<Detail>\n')
+
+        for i in range(self.other_entries):
+            parts.append(f'<Entry><Name>Other Test {i}</Name><Result>Pass</Result><Group>'
+                         '<Measurement>Value</Measurement><Record>')
+            parts.extend(f'<Value>{x}</Value>' for x in range(100))
+            parts.append('</Record></Group></Entry>\n')
+
+        for test, test_values in values.items():
+            tx_rx = test.split(' ')[0]
+            parts.append(f'<Entry><Name>{test}</Name><Result>Pass</Result><Group>'
+                         '<Measurement>Pk-Pk</Measurement><Record>')
+            parts.extend(f'<Value Record="{tx_rx} Element[{i}]">{x:.5f}</Value>'
+                         for i, x in enumerate(test_values))
+            parts.append('</Record></Group></Entry>\n')
+        parts.append('</Detail>\n</Report>\n')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+
+    def generate(self):
+        '''
+        Writes all files.
+
+        Returns
+        -------
+        sfcs : List of Strings
+
+        '''
+        sfcs = []
+        for wafer in range(self.wafers):
+            sfc = self.sfc(wafer)
+            folder = self.folder(wafer)
+            os.makedirs(folder, exist_ok=True)
+            for a, asic in enumerate(self.asic_list):
+                rng = np.random.default_rng([self.seed, wafer, a])
+                gain = rng.normal(1.0, 0.1)
+                for s, (stage, tests) in enumerate(STAGE_TESTS.items()):
+                    timestamp = self.start + timedelta(days=wafer, hours=s, seconds=a)
+                    stage_gain = gain * (1.0 if stage == 'Baseline' else rng.normal(0.98, 0.01))
+
+                    # Older retests and aborted runs are written alongside the newest file
+                    runs = [(timestamp, False)]
+                    if rng.random() < self.retest:
+                        runs.append((timestamp - timedelta(minutes=30), False))
+                    if rng.random() < self.aborted:
+                        runs.append((timestamp + timedelta(minutes=30), True))
+
+                    for run_time, aborted in runs:
+                        name = f'{sfc} {asic}-Die Test {stage}-{run_time.strftime("%m%d%Y %H%M%S")}'
+                        if aborted:
+                            name += ' ABORTED'
+                        values = {} if aborted else {x: self.values(rng, stage_gain) for x in tests}
+                        self.write_file(os.path.join(folder, name + '.xml'), sfc, asic, stage,
+                                        run_time, values, aborted)
+            sfcs.append(sfc)
+        return sfcs
+
+    def write_config(self, path=None):
+        '''
+        Writes configuration file for the generated data.
+
+        Returns
+        -------
+        path : Path
+
+        '''
+        path = path or os.path.join(self.location, 'configuration_synthetic.json')
+        config = {'input_directory': self.location,
+                  'asic_list': self.asic_list,
+                  'wafer': {'rows': self.layout.rows, 'columns': self.layout.cols},
+                  'asic': {'rows': self.layout.asic_shape[0], 'columns': self.layout.asic_shape[1],
+                           'elements': self.layout.n_elements}}
+        with open(path, 'w') as f:
+            json.dump(config, f, indent=2)
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic Die Test XML files.')
+    parser.add_argument('location', help='Directory to write data to')
+    parser.add_argument('--wafers', type=int, default=1, help='Number of wafers (default: %(default)s)')
+    parser.add_argument('--asics', type=int, default=len(DEFAULT_ASIC_LIST),
+                        help='ASICs per wafer, first N of the standard wafer (default: %(default)s)')
+    parser.add_argument('--retest', type=float, default=0.0,
+                        help='Probability of an older retest file per test (default: %(default)s)')
+    parser.add_argument('--aborted', type=float, default=0.0,
+                        help='Probability of an extra ABORTED file per test (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=1,
+                        help='Folder levels above the files (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.asics <= len(DEFAULT_ASIC_LIST):
+        parser.error(f'--asics must be between 1 and {len(DEFAULT_ASIC_LIST)}')
+    data = SyntheticData(args.location, args.wafers, DEFAULT_ASIC_LIST[:args.asics], args.retest,
+                         args.aborted, args.depth, seed=args.seed)
+    sfcs = data.generate()
+    config = data.write_config()
+    print(f'Wrote {len(sfcs)} wafers ({", ".join(sfcs)}) to {data.location}')
+    print(f'Configuration: {config}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+import parse_data
+
+TESTS = [['Tx Element Peak-Peak', 'Pk-Pk']]
+
+SETUP = ('<Setup><Timestamp>2022-05-12T08:00:00</Timestamp><ReportRevision>1.0</ReportRevision>'
+         '<Operator>op</Operator><Equipment>HotChuck</Equipment><PlatformTestSW>1</PlatformTestSW>'
+         '<ProductTestSW>2</ProductTestSW><Product>P</Product><ProcessStep>Die Test Elevated'
+         '</ProcessStep><LotNumber>R0EQ</LotNumber><ProductSN>R0EQLE01 001_006</ProductSN></Setup>')
+SUMMARY = '<Summary><Other>x</Other><OverallResult>Pass</OverallResult></Summary>'
+DETAIL = ('<Detail><Entry><Name>Tx Element Peak-Peak</Name><Result>Pass</Result><Group>'
+          '<Measurement>Pk-Pk</Measurement><Record>'
+          + ''.join(f'<Value Record="Tx Element[{i}]">{i}.5</Value>' for i in range(6))
+          + '</Record></Group></Entry></Detail>')
+
+
+@pytest.mark.parametrize('order', [(SETUP, SUMMARY, DETAIL),
+                                   (SUMMARY, DETAIL, SETUP),
+                                   (DETAIL, SETUP, SUMMARY),
+                                   (DETAIL, SUMMARY, SETUP)])
+@pytest.mark.parametrize('boundary', [b'</ReportRevision>', b'<OverallResult>'])
+def test_stop_early_reads_whole_sections(monkeypatch, order, boundary):
+    xml = ('<?xml version="1.0"?><Report>' + ''.join(order) + '</Report>').encode()
+    # First chunk ends inside Setup or Summary, after the section's first field
+    monkeypatch.setattr(parse_data, 'READ_CHUNK', xml.index(boundary))
+
+    early = parse_data.extract_xml(io.BytesIO(xml), TESTS)
+    full = parse_data.extract_xml(io.BytesIO(xml), TESTS, stop_early=False)
+
+    assert early == full
+    assert early[0]['ProductSN'] == 'R0EQLE01 001_006'
+    assert early[0]['OverallResult'] == 'Pass'
+    assert len(early[1]['Tx Element Peak-Peak___Pk-Pk']['Values']) == 6
+
+
+def entry(name, measurement, values):
+    return (f'<Entry><Name>{name}</Name><Result>Pass</Result><Group><Measurement>{measurement}'
+            '</Measurement><Record>'
+            + ''.join(f'<Value Record="Tx Element[{i}]">{x}</Value>' for i, x in enumerate(values))
+            + '</Record></Group></Entry>')
+
+
+def test_stop_early_waits_for_requested_measurement(monkeypatch):
+    # First Entry with the requested Name has another Measurement only
+    detail = ('<Detail>' + entry('Tx Element Peak-Peak', 'Mean', ['0', '1'])
+              + entry('Rx Element Peak-Peak', 'Pk-Pk', ['9'])
+              + entry('Tx Element Peak-Peak', 'Pk-Pk', ['2', '3']) + '</Detail>')
+    xml = ('<?xml version="1.0"?><Report>' + SETUP + SUMMARY + detail + '</Report>').encode()
+    monkeypatch.setattr(parse_data, 'READ_CHUNK', 64)
+
+    early = parse_data.extract_xml(io.BytesIO(xml), TESTS)
+    full = parse_data.extract_xml(io.BytesIO(xml), TESTS, stop_early=False)
+
+    assert early == full
+    assert early[1]['Tx Element Peak-Peak___Pk-Pk'] == {'TestResult': 'Pass', 'Values': ['2', '3']}
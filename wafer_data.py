@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+from wafer_layout import ASIC_COLS, ASIC_ROWS
+
+
+class WaferData():
+    '''
+    Parsed results of one test for every ASIC of a wafer.
+
+    Element values are held in a single preallocated array of shape (n_asics, ASIC Rows, ASIC Columns).
+    Setup/Summary fields are held in a small metadata DataFrame indexed by ProductSN,
+    in the same order as the first axis of the element array.
+    '''
+
+    def __init__(self, test, meta, elements):
+        self.test = test
+        self.meta = meta
+        self.elements = elements
+        self.asic_index = {sn[-7:]: i for i, sn in enumerate(meta.index)}
+        self._normalized = None
+
+    @classmethod
+    def allocate(cls, test, n_asics, dtype=np.float64, shape=(ASIC_ROWS, ASIC_COLS)):
+        '''
+        Creates empty WaferData with room for n_asics ASICs.
+
+        Parameters
+        ----------
+        test : String
+            Test key. i.e. 'Tx Element Peak-Peak___Pk-Pk'
+        n_asics : Integer
+            Number of ASICs (Test Result files)
+        dtype : NumPy dtype
+            float64 or float32
+        shape : Tuple
+            (Rows, Columns) of elements of one ASIC. i.e. WaferLayout.asic_shape
+
+        Returns
+        -------
+        WaferData
+
+        '''
+        elements = np.empty((n_asics,) + tuple(shape), dtype=dtype)
+        return cls(test, pd.DataFrame(), elements)
+
+    @classmethod
+    def from_rows(cls, test, rows, elements):
+        '''
+        Creates WaferData from existing element array and list of Setup/Summary dictionaries
+        (one per ASIC, in element order). i.e. an exported wafer
+        '''
+        data = cls(test, pd.DataFrame(), elements)
+        data.set_meta(rows)
+        return data
+
+    def set_meta(self, rows):
+        '''
+        Sets metadata table from list of Setup/Summary dictionaries (one per ASIC, in element order).
+        '''
+        self.meta = pd.DataFrame(rows).set_index('ProductSN', drop=False)
+        self.meta.index.name = None
+        self.asic_index = {sn[-7:]: i for i, sn in enumerate(self.meta.index)}
+
+    def __len__(self):
+        return self.elements.shape[0]
+
+    def asics(self):
+        '''
+        Returns list of ASIC keys (Row_Column) in element order.
+        '''
+        return list(self.asic_index.keys())
+
+    def asic(self, asic):
+        '''
+        Returns (Rows, Columns) view of element values for an ASIC.
+
+        Parameters
+        ----------
+        asic : String
+            Row_Column. i.e. '001_006'
+
+        Returns
+        -------
+        elements : Array
+            View into the element array (no copy)
+
+        '''
+        return self.elements[self.asic_index[asic]]
+
+    def normalized(self):
+        '''
+        Returns element values of every ASIC divided by that ASIC's mean, same shape as elements.
+        Computed once and shared by all users of this WaferData (elements must not be changed after).
+        '''
+        if self._normalized is None:
+            self._normalized = self.elements / \
+                self.elements.mean(axis=(1, 2), keepdims=True)
+        return self._normalized
+
+    def to_frame(self):
+        '''
+        Returns results in wide DataFrame form with ProductSN as index and
+        one '{Tx/Rx} Element[i]' column per element.
+        '''
+        tx_rx = self.test.split(' ')[0]
+        columns = [f'{tx_rx} Element[{i}]' for i in range(
+            self.elements[0].size if len(self) else 0)]
+        values = pd.DataFrame(self.elements.reshape(len(self), -1),
+                              index=self.meta.index, columns=columns)
+        return pd.concat([self.meta, values], axis=1)
+
+
+class Alignment():
+    '''
+    ASICs of two WaferData matched by ASIC key (Row_Column).
+
+    Attributes
+    ----------
+    asics : List
+        ASICs found in both, in order of the second WaferData
+    first_index, second_index : Arrays
+        Position of each matched ASIC in the element arrays of the first and second WaferData
+    first_only, second_only : Lists
+        ASICs found in only one of them
+    mismatched : List of (ASIC, First ProductSN, Second ProductSN)
+        Matched ASICs whose full ProductSN differs
+    '''
+
+    def __init__(self, first, second):
+        self.asics = [x for x in second.asics() if x in first.asic_index]
+        self.first_index = np.array([first.asic_index[x] for x in self.asics], dtype=np.intp)
+        self.second_index = np.array([second.asic_index[x] for x in self.asics], dtype=np.intp)
+        self.first_only = [x for x in first.asics() if x not in second.asic_index]
+        self.second_only = [x for x in second.asics() if x not in first.asic_index]
+        first_sn = first.meta.index[self.first_index]
+        second_sn = second.meta.index[self.second_index]
+        self.mismatched = [(asic, a, b) for asic, a, b in zip(self.asics, first_sn, second_sn)
+                           if a != b]
+
+    def report(self, first_name='Baseline', second_name='Elevated'):
+        '''
+        Returns list of messages describing unmatched and mismatched ASICs (empty if all match).
+        '''
+        messages = []
+        if self.first_only:
+            messages.append(f'ASICs only in {first_name}: {", ".join(self.first_only)}')
+        if self.second_only:
+            messages.append(f'ASICs only in {second_name}: {", ".join(self.second_only)}')
+        for asic, a, b in self.mismatched:
+            messages.append(f'ASIC {asic} ProductSN differs: {first_name} {a}, {second_name} {b}')
+        return messages
+
+
+def ratio(baseline, elevated):
+    '''
+    Returns Elevated / Baseline of every element of every ASIC found in both, computed in one
+    vectorized pass over the aligned element arrays.
+
+    Parameters
+    ----------
+    baseline, elevated : WaferData
+        Same test
+
+    Returns
+    -------
+    ratio : WaferData
+        In Elevated order, with Elevated metadata
+    alignment : Alignment
+
+    '''
+    alignment = Alignment(baseline, elevated)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = elevated.elements[alignment.second_index] / \
+            baseline.elements[alignment.first_index]
+    return WaferData(elevated.test, elevated.meta.iloc[alignment.second_index], values), alignment
+
+
+if __name__ == '__main__':
+    pass
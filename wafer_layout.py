@@ -0,0 +1,165 @@
+from collections import namedtuple
+from functools import cached_property, lru_cache
+
+# Default product: 9 x 13 wafer grid of ASICs with R=40, C=75 elements each
+WAFER_ROWS = 9
+WAFER_COLS = 13
+ASIC_ROWS = 40
+ASIC_COLS = 75
+
+# Site of the wafer grid.
+# asic : 'RRR_CCC' key, grid_row/grid_col : zero based position in plot (row 1 at bottom),
+# label : 'Row:Column', used : ASIC is in asic_list
+Site = namedtuple('Site', ['row', 'col', 'asic', 'grid_row', 'grid_col', 'label', 'used'])
+
+
+def asic_key(row, col):
+    '''
+    Returns ASIC key for a one based wafer Row and Column. i.e. '001_006'
+    '''
+    return f'{row:03.0f}_{col:03.0f}'
+
+
+class WaferLayout():
+    '''
+    Precomputed wafer geometry of a product: wafer grid of ASICs, element shape of one ASIC
+    and the ASICs that are tested.
+
+    Index arrays map each ASIC of asic_list to its grid cell, and element values (in Record order)
+    are reshaped to asic_shape, so parsing and plotting never hardcode a shape.
+    The layout is validated when it is created; index arrays are built on first use, so checking
+    a configuration does not import NumPy.
+
+    Parameters
+    ----------
+    asic_list : List
+        List of ASIC from configuration file
+    wafer_rows, wafer_cols : Integer
+        Wafer grid size in ASICs
+    asic_rows, asic_cols : Integer
+        ASIC size in elements
+
+    Raises
+    ------
+    ValueError
+        Sizes are not positive or an ASIC key is malformed, repeated or outside the wafer grid.
+
+    '''
+
+    def __init__(self, asic_list, wafer_rows=WAFER_ROWS, wafer_cols=WAFER_COLS,
+                 asic_rows=ASIC_ROWS, asic_cols=ASIC_COLS):
+        for name, value in [('wafer rows', wafer_rows), ('wafer columns', wafer_cols),
+                            ('ASIC rows', asic_rows), ('ASIC columns', asic_cols)]:
+            # bool is a subclass of int, but true/false in a configuration is not a size
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ValueError(f'Number of {name} must be a positive integer, got {value!r}.')
+
+        self.asic_list = list(asic_list)
+        self.rows = wafer_rows
+        self.cols = wafer_cols
+        self.asic_shape = (asic_rows, asic_cols)
+        self.n_elements = asic_rows * asic_cols
+
+        # Wafer Row and Column of every ASIC in asic_list
+        self.positions = [self.parse_asic(x) for x in self.asic_list]
+        if len(set(self.asic_list)) != len(self.asic_list):
+            repeated = sorted({x for x in self.asic_list if self.asic_list.count(x) > 1})
+            raise ValueError(f'ASIC list has repeated ASICs: {", ".join(repeated)}')
+        self.site_index = {x: i for i, x in enumerate(self.asic_list)}
+
+        used = set(self.asic_list)
+        self.sites = [Site(row, col, asic_key(row, col), self.rows - row, col - 1, f'{row}:{col}',
+                           asic_key(row, col) in used)
+                      for row in range(1, self.rows + 1) for col in range(1, self.cols + 1)]
+
+    @classmethod
+    def from_config(cls, js):
+        '''
+        Creates WaferLayout from a JSON configuration.
+        "wafer" and "asic" sections are optional and default to the 9 x 13 wafer of 40 x 75 ASICs.
+
+            "wafer": {"rows": 9, "columns": 13},
+            "asic": {"rows": 40, "columns": 75, "elements": 3000}
+
+        Parameters
+        ----------
+        js : Dictionary
+            Configuration file contents
+
+        Raises
+        ------
+        ValueError
+            Configuration does not describe a valid layout.
+
+        Returns
+        -------
+        layout : WaferLayout
+
+        '''
+        wafer = js.get('wafer', {})
+        asic = js.get('asic', {})
+        layout = cls(js['asic_list'],
+                     wafer_rows=wafer.get('rows', WAFER_ROWS),
+                     wafer_cols=wafer.get('columns', WAFER_COLS),
+                     asic_rows=asic.get('rows', ASIC_ROWS),
+                     asic_cols=asic.get('columns', ASIC_COLS))
+        if 'elements' in asic:
+            layout.check_elements(asic['elements'], 'Configuration "asic" section')
+        return layout
+
+    def parse_asic(self, asic):
+        '''
+        Returns one based wafer (Row, Column) of an ASIC key after checking it is on the wafer grid.
+        '''
+        try:
+            row, col = (int(x) for x in asic.split('_'))
+        except (AttributeError, ValueError):
+            raise ValueError(f'ASIC "{asic}" is not a Row_Column key. i.e. "001_006"') from None
+        if not (1 <= row <= self.rows and 1 <= col <= self.cols):
+            raise ValueError(f'ASIC "{asic}" is outside the {self.rows} x {self.cols} wafer grid.')
+        return row, col
+
+    def check_elements(self, count, name='Test'):
+        '''
+        Raises ValueError if count does not match the number of elements of one ASIC.
+        '''
+        if count != self.n_elements:
+            raise ValueError(f'{name} has {count} elements, expected {self.n_elements} '
+                             f'({self.asic_shape[0]} x {self.asic_shape[1]}).')
+
+    @cached_property
+    def site_rows(self):
+        '''
+        Zero based grid row of every ASIC in asic_list (row 1 at bottom of plot).
+        '''
+        import numpy as np
+        return np.array([self.rows - row for row, _ in self.positions], dtype=np.intp)
+
+    @cached_property
+    def site_cols(self):
+        '''
+        Zero based grid column of every ASIC in asic_list.
+        '''
+        import numpy as np
+        return np.array([col - 1 for _, col in self.positions], dtype=np.intp)
+
+    def grid_cells(self, asics):
+        '''
+        Returns zero based grid (Rows, Columns) index arrays for a list of ASICs of asic_list.
+        '''
+        import numpy as np
+        index = np.array([self.site_index[x] for x in asics], dtype=np.intp)
+        return self.site_rows[index], self.site_cols[index]
+
+
+@lru_cache(maxsize=16)
+def get_layout(asic_list, wafer_rows=WAFER_ROWS, wafer_cols=WAFER_COLS,
+               asic_rows=ASIC_ROWS, asic_cols=ASIC_COLS):
+    '''
+    Returns shared WaferLayout for a tuple of ASICs.
+    '''
+    return WaferLayout(asic_list, wafer_rows, wafer_cols, asic_rows, asic_cols)
+
+
+if __name__ == '__main__':
+    pass
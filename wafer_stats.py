@@ -0,0 +1,188 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from wafer_data import Alignment, WaferData
+
+PERCENTILES = (1, 5, 25, 75, 95, 99)
+
+
+def element_stats(elements, limits=None, percentiles=PERCENTILES):
+    '''
+    Computes statistics of every ASIC and of the whole wafer in batched NumPy operations.
+
+    Parameters
+    ----------
+    elements : Array
+        (n_asics, Rows, Columns) element values
+    limits : Tuple of Floats
+        (Lower, Upper) limits of element value divided by its ASIC mean. None to skip the count.
+    percentiles : Tuple of Floats
+
+    Returns
+    -------
+    per_asic : Dictionary of {Column:Array}
+        One value per ASIC for each statistic
+    wafer : Dictionary of {Column:Float}
+        Same statistics over all elements of the wafer
+
+    '''
+    flat = elements.reshape(len(elements), -1)
+    values = flat.ravel()
+    q = [50] + list(percentiles)
+    names = ['Median'] + [f'P{x:g}' for x in percentiles]
+
+    per_asic = {'Elements': np.full(len(flat), flat.shape[1]),
+                'Mean': flat.mean(axis=1, dtype=np.float64),
+                'Std': flat.std(axis=1, ddof=1, dtype=np.float64) if flat.shape[1] > 1
+                else np.full(len(flat), np.nan)}
+    wafer = {'Elements': values.size,
+             'Mean': values.mean(dtype=np.float64) if values.size else np.nan,
+             'Std': values.std(ddof=1, dtype=np.float64) if values.size > 1 else np.nan}
+
+    if len(flat):
+        per_asic.update(zip(names, np.percentile(flat, q, axis=1)))
+        wafer.update(zip(names, np.percentile(values, q)))
+    else:
+        per_asic.update((x, np.empty(0)) for x in names)
+        wafer.update((x, np.nan) for x in names)
+
+    if limits is not None:
+        normalized = flat / per_asic['Mean'][:, None]
+        per_asic['Below'] = (normalized < limits[0]).sum(axis=1)
+        per_asic['Above'] = (normalized > limits[1]).sum(axis=1)
+        per_asic['Out of Limits'] = per_asic['Below'] + per_asic['Above']
+        for x in ['Below', 'Above', 'Out of Limits']:
+            wafer[x] = int(per_asic[x].sum())
+    return per_asic, wafer
+
+
+def profiles(elements):
+    '''
+    Returns element row and column profiles (means) of every ASIC.
+
+    Returns
+    -------
+    row_profile : Array
+        (n_asics, Rows) mean of each element row
+    col_profile : Array
+        (n_asics, Columns) mean of each element column
+
+    '''
+    return elements.mean(axis=2, dtype=np.float64), elements.mean(axis=1, dtype=np.float64)
+
+
+def delta(baseline, elevated):
+    '''
+    Returns Elevated minus Baseline element values for the ASICs found in both.
+
+    Parameters
+    ----------
+    baseline, elevated : WaferData
+
+    Returns
+    -------
+    delta : WaferData
+        In Elevated order, with Elevated metadata
+
+    '''
+    alignment = Alignment(baseline, elevated)
+    return WaferData(elevated.test, elevated.meta.iloc[alignment.second_index],
+                     elevated.elements[alignment.second_index] -
+                     baseline.elements[alignment.first_index])
+
+
+class WaferStats():
+    '''
+    Summary statistics and profiles of one test of a wafer for each stage
+    (i.e. Baseline, Elevated and Delta).
+
+    Parameters
+    ----------
+    sfc : String
+        SFC of Wafer
+    test : String
+        Test key. i.e. 'Tx Element Peak-Peak___Pk-Pk'
+    stages : Dictionary of {Stage:WaferData}
+    limits : Tuple of Floats
+        Limits of element value divided by ASIC mean (i.e. plot_wafers.channel_limits of the
+        test's channel). Not applied to 'Delta'. None to skip the out of limits counts.
+
+    '''
+
+    def __init__(self, sfc, test, stages, limits=None, percentiles=PERCENTILES):
+        self.sfc = sfc
+        self.test = test
+        self.stages = stages
+        self.limits = limits
+        self.percentiles = percentiles
+
+    @classmethod
+    def from_results(cls, sfc, baseline=None, elevated=None, **kwargs):
+        '''
+        Creates WaferStats of Baseline, Elevated and their Delta from one test.
+        Either stage can be None (i.e. Rx has no Baseline).
+        '''
+        stages = {}
+        if baseline is not None:
+            stages['Baseline'] = baseline
+        if elevated is not None:
+            stages['Elevated'] = elevated
+        if baseline is not None and elevated is not None:
+            stages['Delta'] = delta(baseline, elevated)
+        test = (elevated if elevated is not None else baseline).test
+        return cls(sfc, test, stages, **kwargs)
+
+    def summary(self):
+        '''
+        Returns summary table with one row per ASIC and one 'Wafer' row for each stage.
+        '''
+        frames = []
+        for stage, data in self.stages.items():
+            limits = None if stage == 'Delta' else self.limits
+            per_asic, wafer = element_stats(data.elements, limits, self.percentiles)
+            df = pd.DataFrame(per_asic)
+            df.insert(0, 'ASIC', data.asics())
+            df = pd.concat([df, pd.DataFrame([dict(wafer, ASIC='Wafer')])],
+                           ignore_index=True)
+            df.insert(0, 'Stage', stage)
+            df.insert(0, 'SFC', self.sfc)
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def profiles(self):
+        '''
+        Returns row and column profiles in long form (SFC, Stage, ASIC, Axis, Index, Mean).
+        '''
+        frames = []
+        for stage, data in self.stages.items():
+            asics = np.array(data.asics(), dtype=object)
+            for axis, profile in zip(['Row', 'Column'], profiles(data.elements)):
+                n_asics, length = profile.shape
+                frames.append(pd.DataFrame({'SFC': self.sfc,
+                                            'Stage': stage,
+                                            'ASIC': np.repeat(asics, length),
+                                            'Axis': axis,
+                                            'Index': np.tile(np.arange(length), n_asics),
+                                            'Mean': profile.ravel()}))
+        return pd.concat(frames, ignore_index=True)
+
+    def save(self, location):
+        '''
+        Writes summary and profile CSV files next to the HeatMap of the test.
+
+        Returns
+        -------
+        paths : List of Paths
+
+        '''
+        base = os.path.join(location, f'{self.sfc} - {self.test}')
+        paths = [base + ' - Summary.csv', base + ' - Profiles.csv']
+        self.summary().to_csv(paths[0], index=False, float_format='%.6g')
+        self.profiles().to_csv(paths[1], index=False, float_format='%.6g')
+        return paths
+
+
+if __name__ == '__main__':
+    pass
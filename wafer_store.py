@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from wafer_data import WaferData
+
+FORMAT_VERSION = 1
+
+
+class WaferStore():
+    '''
+    Exported parsed wafers in location, one folder per SFC:
+
+        {SFC}/index.json   - format version, datasets and Setup/Summary metadata table of each
+        {SFC}/{i}.npy      - (n_asics, Rows, Columns) float32 element block of dataset i
+
+    Element blocks are plain .npy files so they can be memory-mapped by NumPy (or any tool
+    reading .npy) without loading the whole wafer.
+
+    Parameters
+    ----------
+    location : Path
+        Directory of exported wafers (created if missing)
+    dtype : NumPy dtype
+        Type of stored element values
+
+    '''
+
+    def __init__(self, location, dtype=np.float32):
+        self.location = os.path.abspath(os.path.expanduser(location))
+        self.dtype = np.dtype(dtype)
+        os.makedirs(self.location, exist_ok=True)
+
+    def path(self, sfc):
+        return os.path.join(self.location, sfc.strip().upper())
+
+    def has(self, sfc):
+        return os.path.exists(os.path.join(self.path(sfc), 'index.json'))
+
+    def sfcs(self):
+        '''
+        Returns sorted list of exported SFCs.
+        '''
+        return sorted(x for x in os.listdir(self.location) if self.has(x))
+
+    def save(self, sfc, df_amb, df_hot, df_rx):
+        '''
+        Exports Parser.process_data results of one wafer (replaces previous export of SFC).
+
+        Parameters
+        ----------
+        sfc : String
+            SFC of Wafer
+        df_amb, df_hot, df_rx : Dictionary of {Test:WaferData}
+            Baseline Tx, Elevated Tx and Elevated Rx results
+
+        Returns
+        -------
+        path : Path
+            Folder of exported wafer
+
+        '''
+        path = self.path(sfc)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        datasets = []
+        for group, df_dict in [('Baseline', df_amb), ('Elevated', df_hot), ('Rx', df_rx)]:
+            for test, data in df_dict.items():
+                file_name = f'{len(datasets)}.npy'
+                np.save(os.path.join(tmp_path, file_name),
+                        np.ascontiguousarray(data.elements, dtype=self.dtype))
+                meta = data.meta.astype(object).where(data.meta.notna(), None)
+                datasets.append({'group': group, 'test': test, 'file': file_name,
+                                 'meta': meta.to_dict('records')})
+
+        with open(os.path.join(tmp_path, 'index.json'), 'w') as f:
+            json.dump({'format': FORMAT_VERSION, 'sfc': sfc.strip().upper(),
+                       'datasets': datasets}, f)
+
+        # Previous export is only removed once the new one is complete
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, sfc, mmap=True):
+        '''
+        Reads exported wafer.
+
+        Parameters
+        ----------
+        sfc : String
+            SFC of Wafer
+        mmap : Boolean
+            Memory-map element blocks (read only) instead of reading them into memory
+
+        Raises
+        ------
+        ValueError
+            Export was written with an unknown format version.
+
+        Returns
+        -------
+        df_amb, df_hot, df_rx : Dictionary of {Test:WaferData}
+            Same form as Parser.process_data
+
+        '''
+        path = self.path(sfc)
+        with open(os.path.join(path, 'index.json')) as f:
+            index = json.load(f)
+        if index.get('format') != FORMAT_VERSION:
+            raise ValueError(f'Export "{path}" has unknown format {index.get("format")}.')
+
+        groups = {'Baseline': {}, 'Elevated': {}, 'Rx': {}}
+        for dataset in index['datasets']:
+            elements = np.load(os.path.join(path, dataset['file']),
+                               mmap_mode='r' if mmap else None)
+            groups[dataset['group']][dataset['test']] = WaferData.from_rows(
+                dataset['test'], dataset['meta'], elements)
+        return groups['Baseline'], groups['Elevated'], groups['Rx']
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,321 @@
+'''
+Watch mode: renders each wafer's HeatMaps as soon as its last test file lands.
+
+The file index is polled for new Die Test XML files (file_index.FileIndex only lists folders whose
+modification time changed, so the share is not walked on every poll). Each file is parsed when it arrives
+(once its modification time is a few seconds old, so files still being written are not read),
+and a wafer is rendered as soon as Parser.check_dataset is satisfied for all ASICs in asic_list.
+A newer retest of an ASIC after rendering re-renders the wafer. Wafers whose files stopped
+changing are dropped from memory after a while.
+'''
+import os
+import time
+from datetime import datetime, timedelta
+
+import instrument
+
+
+class WaferProgress():
+    '''
+    Parsed files of one wafer that is being tested.
+    '''
+
+    def __init__(self, parser):
+        self.parser = parser
+        # {Path:(info, data)} extract_arrays results of files parsed so far
+        self.results = {}
+        # {Path:mtime} files that could not be parsed (retried when they change)
+        self.failed = {}
+        # Files of the last rendered dataset (None until rendered)
+        self.rendered = None
+
+
+class WaferWatcher():
+    '''
+    Polls location for test result files and renders wafers as they are completed.
+
+    Parameters
+    ----------
+    location : Path
+        Input Directory
+    asic_list : List
+        List of ASIC from configuration file
+    output_path : Path
+        Directory to store HeatMap output
+    catalog : file_index.FileIndex
+        Refreshed on every poll (default: FileIndex of location in the default database).
+        A FileCatalog also works but walks the whole location on every poll.
+    sfcs : List of Strings
+        Only watch these SFCs (default: all)
+    since : datetime
+        Only watch SFCs with a test file timestamp on or after since
+        (default: within lookback of the current time)
+    lookback : timedelta
+        Test files older than lookback are not watched when since is not given
+    idle : Float
+        Seconds without file changes after which a wafer's parsed files are dropped from memory
+        (parsed again if more files arrive)
+    render_existing : Boolean
+        Render wafers that are already complete on the first poll (default: only wafers
+        completed while watching)
+    interval : Float
+        Seconds between polls
+    settle : Float
+        Seconds since last modification before a file is parsed
+    plots, parser_options, plot_options, render_workers, stats, store
+        Same as batch.BatchRunner
+
+    '''
+
+    def __init__(self, location, asic_list, output_path, catalog=None, sfcs=None, since=None,
+                 render_existing=False, interval=10.0, settle=2.0, plots=('Tx', 'Rx'),
+                 parser_options=None, plot_options=None, render_workers=1, stats=False, store=None,
+                 lookback=timedelta(days=1), idle=6 * 3600.0):
+        self.location = location
+        self.asic_list = asic_list
+        self.output_path = output_path
+        if catalog is None:
+            from file_index import FileIndex
+            catalog = FileIndex(location)
+        self.catalog = catalog
+        self.sfcs = None if sfcs is None else {x.strip().upper() for x in sfcs}
+        self.since = since
+        self.lookback = lookback
+        self.idle = idle
+        self.render_existing = render_existing
+        self.interval = interval
+        self.settle = settle
+        self.plots = list(plots)
+        self.parser_options = parser_options
+        self.plot_options = plot_options
+        self.render_workers = render_workers
+        self.stats = stats
+        self.store = store
+        # {SFC:WaferProgress}
+        self.wafers = {}
+        # {SFC:hash of the set of file paths} of each SFC at the last poll
+        self.signatures = {}
+        # {SFC:time} last time the files of each SFC changed
+        self.changed = {}
+        # SFCs with files that were not settled yet
+        self.pending = set()
+        self.polls = 0
+
+    def run(self, polls=None):
+        '''
+        Polls until interrupted (Ctrl+C) or for a number of polls.
+
+        Returns
+        -------
+        rendered : List of Strings
+            SFCs rendered, in order.
+
+        '''
+        print(f'Watching {self.location} every {self.interval:g} seconds (Ctrl+C to stop).')
+        rendered = []
+        try:
+            while polls is None or self.polls < polls:
+                start = time.perf_counter()
+                rendered.extend(self.poll())
+                if polls is None or self.polls < polls:
+                    time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+        except KeyboardInterrupt:
+            print('Stopped watching.')
+        return rendered
+
+    def poll(self):
+        '''
+        Rescans catalog, parses new files and renders completed wafers.
+
+        Returns
+        -------
+        rendered : List of Strings
+            SFCs rendered by this poll.
+
+        '''
+        first = self.polls == 0
+        self.polls += 1
+        with instrument.span('watch_scan'):
+            if hasattr(self.catalog, 'refresh'):
+                self.catalog.refresh()
+            else:
+                self.catalog.scan()
+
+        since = self.since if self.since is not None else datetime.now() - self.lookback
+        sfcs = [x for x in self.catalog.sfcs(since=since) if self.sfcs is None or x in self.sfcs]
+        rendered = []
+        for sfc in sfcs:
+            signature = hash(frozenset(self.catalog.files(sfc)))
+            if self.signatures.get(sfc) == signature and sfc not in self.pending:
+                continue
+            if self.signatures.get(sfc) != signature:
+                self.signatures[sfc] = signature
+                self.changed[sfc] = time.time()
+            if self.update(sfc, first):
+                rendered.append(sfc)
+        self.evict(set(sfcs))
+        return rendered
+
+    def evict(self, sfcs):
+        '''
+        Drops wafers that are no longer watched (outside since) or whose files have not changed
+        for idle seconds. Signatures of watched SFCs are kept (small), so an evicted wafer is only
+        parsed again when its files change.
+        '''
+        now = time.time()
+        for sfc in list(self.changed):
+            if sfc in sfcs and now - self.changed[sfc] < self.idle:
+                continue
+            self.wafers.pop(sfc, None)
+            self.pending.discard(sfc)
+            del self.changed[sfc]
+            if sfc not in sfcs:
+                self.signatures.pop(sfc, None)
+
+    def update(self, sfc, first=False):
+        '''
+        Parses settled new files of SFC and renders it when its dataset is complete.
+
+        Returns
+        -------
+        rendered : Boolean
+
+        '''
+        wafer = self.wafers.get(sfc)
+        if wafer is None:
+            import parse_data
+            wafer = self.wafers[sfc] = WaferProgress(parse_data.Parser(
+                self.location, self.asic_list, sfc, catalog=self.catalog,
+                **(self.parser_options or {})))
+        parser = wafer.parser
+
+        # Newest file of each ASIC and stage, as in Parser.process_data
+        list_amb, list_hot = parser.sort_files(self.catalog.files(sfc))
+        complete, list_amb, list_hot, _, count_in_amb, count_in_hot = parser.check_dataset(
+            self.asic_list, list_amb, list_hot)
+        dataset = tuple(list_amb + list_hot)
+        if dataset == wafer.rendered:
+            self.pending.discard(sfc)
+            return False
+        if first and complete and not self.render_existing:
+            # Wafers tested before watching started are left to the batch scripts
+            wafer.rendered = dataset
+            return False
+
+        # Results of files replaced by a retest are dropped
+        wafer.results = {k: v for k, v in wafer.results.items() if k in dataset}
+        wafer.failed = {k: v for k, v in wafer.failed.items() if k in dataset}
+        test_list_tx = parser.create_test_list('Tx')
+        test_list_rx = parser.create_test_list('Rx')
+        before = len(wafer.results)
+        waiting = self.parse_new(wafer, sfc, list_amb, test_list_tx) + \
+            self.parse_new(wafer, sfc, list_hot, test_list_tx + test_list_rx)
+        # Files still being written and files that failed to parse are checked on every poll
+        if waiting or wafer.failed:
+            self.pending.add(sfc)
+        else:
+            self.pending.discard(sfc)
+
+        parsed = len(wafer.results)
+        if parsed > before:
+            print(f'{sfc}: {parsed}/{2 * len(self.asic_list)} files parsed (found Baseline '
+                  f'{count_in_amb}, Elevated {count_in_hot} of {len(self.asic_list)} ASICs).')
+        if not complete or parsed < len(dataset):
+            return False
+        return self.render(wafer, sfc, list_amb, list_hot, test_list_tx, test_list_rx)
+
+    def parse_new(self, wafer, sfc, file_list, list_of_tests):
+        '''
+        Parses files of file_list that are not parsed yet and are no longer being written.
+
+        Returns
+        -------
+        waiting : Integer
+            Number of files that were skipped because they changed less than settle seconds ago.
+
+        '''
+        now = time.time()
+        new = []
+        waiting = 0
+        for path in file_list:
+            if path in wafer.results:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if wafer.failed.get(path) == mtime:
+                continue
+            if now - mtime < self.settle:
+                waiting += 1
+                continue
+            new.append((path, mtime))
+        if not new:
+            return waiting
+
+        with instrument.span('watch_parse', {'sfc': sfc}, files=len(new)):
+            try:
+                results = wafer.parser.extract_results([x for x, _ in new], list_of_tests)
+            except Exception:
+                # One bad file should not hold back the others
+                results = [self.extract_one(wafer, path, mtime, list_of_tests) for path, mtime in new]
+        for (path, _), result in zip(new, results):
+            if result is not None:
+                wafer.results[path] = result
+                wafer.failed.pop(path, None)
+        return waiting
+
+    def extract_one(self, wafer, path, mtime, list_of_tests):
+        try:
+            return wafer.parser.extract_results([path], list_of_tests)[0]
+        except Exception as e:
+            print(f'Could not parse "{path}": {type(e).__name__}: {e}')
+            wafer.failed[path] = mtime
+            return None
+
+    def render(self, wafer, sfc, list_amb, list_hot, test_list_tx, test_list_rx):
+        '''
+        Builds Parser.process_data results from the parsed files and renders wafer.
+
+        Returns
+        -------
+        rendered : Boolean
+
+        '''
+        from batch import render_wafer
+        from parse_data import test_key
+
+        parser = wafer.parser
+        dataset = tuple(list_amb + list_hot)
+        try:
+            df_amb = parser.fill_data([wafer.results[x] for x in list_amb], test_list_tx)
+            df_hot_all = parser.fill_data([wafer.results[x] for x in list_hot],
+                                          test_list_tx + test_list_rx)
+            df_hot = {test_key(x): df_hot_all[test_key(x)] for x in test_list_tx}
+            df_rx = {test_key(x): df_hot_all[test_key(x)] for x in test_list_rx}
+            parser.keys_match(df_amb, df_hot)
+
+            if self.store is not None:
+                with instrument.span('store_save', {'sfc': sfc}):
+                    self.store.save(sfc, df_amb, df_hot, df_rx)
+            print(f'{sfc}: all {len(self.asic_list)} ASICs tested, rendering.')
+            render_wafer(sfc, df_amb, df_hot, df_rx, self.asic_list, self.output_path, self.plots,
+                         self.plot_options, self.render_workers, self.stats)
+        except Exception as e:
+            print(f'{sfc}: {type(e).__name__}: {e}')
+            # Not retried until the wafer's files change
+            wafer.rendered = dataset
+            return False
+
+        for cache in (parser.mirror_cache, parser.result_cache):
+            if cache is not None:
+                cache.save()
+        # Parsed results are only needed again if the wafer is retested
+        wafer.rendered = dataset
+        wafer.results = {}
+        print(f'{sfc}: Plots saved at {self.output_path}')
+        return True
+
+
+if __name__ == '__main__':
+    pass